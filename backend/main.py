@@ -1,4 +1,5 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -41,6 +42,20 @@ def startup():
     Base.metadata.create_all(bind=engine)
 
 
+@app.on_event("startup")
+async def prewarm_ollama():
+    # Load the council models in the background; startup must not wait on Ollama
+    from services.swarm import prewarm_models
+    app.state.prewarm_task = asyncio.create_task(prewarm_models())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    from services import rag_retriever, swarm
+    await swarm.aclose_client()
+    await rag_retriever.aclose_client()
+
+
 # Routers
 app.include_router(auth.router)
 app.include_router(subjects.router)
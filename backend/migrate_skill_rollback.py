@@ -20,6 +20,7 @@ def migrate():
         ("auto_deactivated", "INTEGER DEFAULT 0"),
         ("deactivation_reason", "TEXT DEFAULT NULL"),
         ("previous_trained_score", "REAL DEFAULT 0.0"),
+        ("trained_score_partial", "INTEGER DEFAULT 0"),
     ]
     
     for col_name, col_def in new_columns:
@@ -1,5 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, Float, Boolean, DateTime, JSON, ForeignKey, UniqueConstraint
+    Column, Integer, String, Text, Float, Boolean, DateTime, JSON, ForeignKey, UniqueConstraint,
+    LargeBinary,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -236,6 +237,7 @@ class Skill(Base):
     skill_content = Column(Text, nullable=True)
     baseline_score = Column(Float, default=0.0)
     trained_score = Column(Float, default=0.0)
+    trained_score_partial = Column(Boolean, default=False)  # early-stopped: trained_score is a bound
     improvement_pct = Column(Float, default=0.0)
     test_cases_json = Column(Text, nullable=True)
     total_test_cases = Column(Integer, default=0)
@@ -286,3 +288,28 @@ class BenchmarkRecord(Base):
     success = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    key = Column(String(64), nullable=False, unique=True, index=True)  # sha256(model|system|prompt)
+    scope = Column(String(64), nullable=False, index=True)  # semantic lookups only match within a scope
+    model = Column(String(100))
+    prompt_text = Column(Text)
+    embedding = Column(LargeBinary, nullable=True)  # float32 bytes, unit-normalised
+    response = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class BaselineCache(Base):
+    __tablename__ = "baseline_cache"
+    __table_args__ = (UniqueConstraint("subject_id", "model", "tc_hash"),)
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"), nullable=False)
+    model = Column(String(100), nullable=False)
+    tc_hash = Column(String(64), nullable=False)  # sha256 of the scored test case fields
+    score = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -13,8 +13,8 @@ from models import (
     LearningOutcome, UnitCOMapping, BenchmarkRecord, VettedQuestion
 )
 from schemas import RubricCreate, RubricResponse, GenerateRequest, JobStatusResponse, QuestionResponse
-from services import rag, swarm, benchmark
-from services.rag_retriever import retrieve_context_for_generation
+from services import rag, swarm, benchmark, rag_retriever
+from services.rag_retriever import retrieve_context_for_generation_async
 from services.novelty import check_novelty, validate_grounding, register_question, get_chunk_usage_counts
 from services.redis_cache import RedisCache
 
@@ -239,7 +239,7 @@ async def _run_generation(job_id: int, rubric_id: int, difficulty: str = "Medium
                 # Get chunk usage counts for diversity penalty
                 chunk_usage = get_chunk_usage_counts(subject.id, qp["topic_id"])
                 
-                rag_result = retrieve_context_for_generation(
+                rag_result = await retrieve_context_for_generation_async(
                     subject_id=subject.id,
                     unit_id=qp["unit_id"],
                     topic_id=qp["topic_id"],
@@ -313,7 +313,9 @@ async def _run_generation(job_id: int, rubric_id: int, difficulty: str = "Medium
                     bloom_level=bloom_level,
                 )
 
-                # Record phase benchmarks
+                # Record phase benchmarks; failed agent calls come back as empty output,
+                # so success is read from the steps the council reports as failed
+                failed_steps = set(result.get("failed_steps", ()))
                 for phase_key, phase_name in [
                     ("agent_a", "agent_a"),
                     ("agent_b", "agent_b_review"),
@@ -322,7 +324,7 @@ async def _run_generation(job_id: int, rubric_id: int, difficulty: str = "Medium
                 ]:
                     phase_time = result["timings"].get(phase_key, 0)
                     model_used = result["models_used"].get(phase_key, "unknown")
-                    phase_success = not result.get(f"{phase_key}_draft", "").startswith("[ERROR]") if phase_key != "chairman" else True
+                    phase_success = phase_key not in failed_steps
                     benchmark.record_phase(
                         db, job_id, idx, phase_name, model_used, phase_time, phase_success
                     )
@@ -349,7 +351,7 @@ async def _run_generation(job_id: int, rubric_id: int, difficulty: str = "Medium
                             if res: return res
                     return None
 
-                logger.debug(f"Raw result type: {type(result)}, q_data type: {type(q_data)}")
+                logger.debug("Raw result type: %s, q_data type: %s", type(result), type(q_data))
 
                 q_payload = None
                 if isinstance(q_data, dict):
@@ -410,7 +412,7 @@ async def _run_generation(job_id: int, rubric_id: int, difficulty: str = "Medium
                     
                     if matches:
                         options = [m.strip() for m in matches]
-                        logger.debug(f"Extracted options from text: {len(options)} found")
+                        logger.debug("Extracted options from text: %d found", len(options))
 
                 # --- Safety net: Ensure MCQ always has exactly 4 options ---
                 if options is not None and "MCQ" in result.get("question_type", "MCQ"):
@@ -563,9 +565,18 @@ async def _run_generation(job_id: int, rubric_id: int, difficulty: str = "Medium
         db.close()
 
 
+async def _run_generation_in_loop(job_id: int, rubric_id: int, difficulty: str):
+    try:
+        await _run_generation(job_id, rubric_id, difficulty)
+    finally:
+        # This loop dies with asyncio.run — release its pooled Ollama connections
+        await swarm.aclose_client()
+        await rag_retriever.aclose_client()
+
+
 def _run_generation_sync(job_id: int, rubric_id: int, difficulty: str = "Medium"):
     """Sync wrapper for BackgroundTasks."""
-    asyncio.run(_run_generation(job_id, rubric_id, difficulty))
+    asyncio.run(_run_generation_in_loop(job_id, rubric_id, difficulty))
 
 
 @router.post("/generate/")
@@ -48,7 +48,7 @@ def start_training_job(
         db.commit()
         db.refresh(skill)
     else:
-        if skill.training_status in ["generating", "evaluating_baseline", "evaluating_skill"]:
+        if skill.training_status in ["generating", "evaluating", "evaluating_baseline", "evaluating_skill"]:
             raise HTTPException(status_code=409, detail="Training already in progress")
         
         # Increment version and reset — save previous score for rollback comparison
@@ -110,6 +110,7 @@ def get_training_status(
         progress=skill.training_progress,
         baseline_score=skill.baseline_score,
         trained_score=skill.trained_score,
+        trained_score_partial=bool(skill.trained_score_partial),
         improvement_pct=skill.improvement_pct,
         training_log=skill.training_log,
         error_message=skill.error_message,
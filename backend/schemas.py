@@ -285,6 +285,7 @@ class TrainingStatus(BaseModel):
     progress: int = 0
     baseline_score: float = 0.0
     trained_score: float = 0.0
+    trained_score_partial: bool = False
     improvement_pct: float = 0.0
     training_log: str = ""
     error_message: Optional[str] = None
@@ -304,6 +305,7 @@ class SkillResponse(BaseModel):
     version: int
     skill_content: Optional[str] = None
     trained_score: float
+    trained_score_partial: bool = False
     is_active: bool = True
     auto_deactivated: bool = False
     deactivation_reason: Optional[str] = None
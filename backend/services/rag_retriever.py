@@ -1,8 +1,12 @@
 """
 RAG Retriever v2 — Hybrid vector + BM25 retrieval with cross-encoder reranking.
-Main entry point: retrieve_context_for_generation()
+Main entry point: retrieve_context_for_generation_async()
+(retrieve_context_for_generation() is a sync shim for legacy callers)
 """
+import asyncio
 import time
+import weakref
+import httpx
 import numpy as np
 from rank_bm25 import BM25Okapi
 
@@ -13,7 +17,6 @@ from services.cached_embedding import cached_embedding_fn
 
 _redis = RedisCache()
 
-import requests
 import re
 
 def _is_noisy_chunk(text: str) -> bool:
@@ -113,10 +116,41 @@ def _cluster_by_proximity(
     cluster_scores.sort(key=lambda x: x[0], reverse=True)
     return [c[1] for c in cluster_scores]
 
-def extract_subtopics(collection, topic_name: str, where_clause: dict) -> list[str]:
+_OLLAMA_GENERATE_URL = "http://127.0.0.1:11434/api/generate"
+
+# One client per event loop: each generation job and sync shim runs its own loop
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _get_http() -> httpx.AsyncClient:
+    """Shared async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=20)
+        _http_clients[loop] = client
+    return client
+
+
+async def aclose_client():
+    """Close the running loop's shared clients (app shutdown / end of a worker job)."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+    await _redis.aclose_aclient()
+
+
+async def _run_and_close(coro):
+    try:
+        return await coro
+    finally:
+        await aclose_client()
+
+
+async def _extract_subtopics_async(collection, topic_name: str, where_clause: dict) -> list[str]:
     """Automated Diversity Phase: fetch intro + coverage chunks, extract subtopics via LLM."""
     try:
-        result = collection.get(where=where_clause, include=["documents"])
+        result = await asyncio.to_thread(collection.get, where=where_clause, include=["documents"])
         docs = result.get("documents", [])
         if not docs:
             return []
@@ -137,7 +171,7 @@ def extract_subtopics(collection, topic_name: str, where_clause: dict) -> list[s
             "stream": False,
             "temperature": 0.3
         }
-        resp = requests.post("http://127.0.0.1:11434/api/generate", json=payload, timeout=20)
+        resp = await _get_http().post(_OLLAMA_GENERATE_URL, json=payload)
         if resp.status_code == 200:
             text = resp.json().get("response", "")
             return [t.strip().strip("-*") for t in text.split(",") if len(t.strip()) > 3][:12]
@@ -147,6 +181,11 @@ def extract_subtopics(collection, topic_name: str, where_clause: dict) -> list[s
         return []
 
 
+def extract_subtopics(collection, topic_name: str, where_clause: dict) -> list[str]:
+    """Sync shim around _extract_subtopics_async for legacy callers."""
+    return asyncio.run(_run_and_close(_extract_subtopics_async(collection, topic_name, where_clause)))
+
+
 # ─── Cross-Encoder (lazy loaded) ───
 
 _cross_encoder = None
@@ -243,6 +282,41 @@ def _vector_retrieve(
         return [], [], [], [], []
 
 
+def _vector_retrieve_batch(
+    collection,
+    query_texts: list[str],
+    fetch_k: int,
+    where_clause: dict = None,
+) -> list[tuple[list[str], list[str], list[list[float]], list[float], list[dict]]]:
+    """
+    Perform one ChromaDB vector retrieval for several queries at once.
+    Returns one (documents, ids, embeddings, distances, metadatas) tuple per query.
+    """
+    empty = ([], [], [], [], [])
+    if not query_texts:
+        return []
+    try:
+        results = collection.query(
+            query_texts=query_texts,
+            n_results=fetch_k,
+            where=where_clause,
+            include=["documents", "embeddings", "distances", "metadatas"],
+        )
+
+        def _row(key: str, q: int) -> list:
+            rows = results.get(key)
+            return list(rows[q]) if rows is not None and len(rows) > q else []
+
+        return [
+            (_row("documents", q), _row("ids", q), _row("embeddings", q),
+             _row("distances", q), _row("metadatas", q))
+            for q in range(len(query_texts))
+        ]
+    except Exception as e:
+        print(f"[RAG-V2] Batch vector retrieval error: {e}")
+        return [empty for _ in query_texts]
+
+
 def _distances_to_scores(distances: list[float]) -> list[float]:
     """Convert ChromaDB distances (lower=better) to similarity scores (higher=better)."""
     if not distances:
@@ -252,9 +326,35 @@ def _distances_to_scores(distances: list[float]) -> list[float]:
     return [1.0 / (1.0 + d) for d in distances]
 
 
+async def _retrieve_variants_async(
+    collection,
+    query_texts: list[str],
+    fetch_k: int,
+    where_clause: dict = None,
+) -> list[tuple[list[str], list[str], list[list[float]], list[float], list[dict]]]:
+    """Batched scoped retrieval, falling back to subject-wide for variants with no hits."""
+    results = await asyncio.to_thread(
+        _vector_retrieve_batch, collection, query_texts, fetch_k, where_clause
+    )
+    if where_clause is not None:
+        empty_idx = [q for q, res in enumerate(results) if len(res[0]) == 0]
+        if empty_idx:
+            fallback = await asyncio.to_thread(
+                _vector_retrieve_batch, collection, [query_texts[q] for q in empty_idx], fetch_k, None
+            )
+            for q, res in zip(empty_idx, fallback):
+                results[q] = res
+    return results
+
+
 # ─── Main Entry Point ───
 
-def retrieve_context_for_generation(
+def retrieve_context_for_generation(*args, **kwargs) -> dict:
+    """Sync shim around retrieve_context_for_generation_async for legacy callers."""
+    return asyncio.run(_run_and_close(retrieve_context_for_generation_async(*args, **kwargs)))
+
+
+async def retrieve_context_for_generation_async(
     subject_id: int,
     unit_id: int = None,
     topic_id: int = None,
@@ -334,43 +434,49 @@ def retrieve_context_for_generation(
         where_clause = {"unit_id": str(unit_id)}
         
     # --- Automated Diversity Phase (Subtopic Extraction) ---
-    subtopics = extract_subtopics(collection, topic_name, where_clause)
+    # The subtopic LLM call overlaps with the batched retrieval of the base variants
+    subtopics, variant_results = await asyncio.gather(
+        _extract_subtopics_async(collection, topic_name, where_clause),
+        _retrieve_variants_async(collection, [v.text for v in variants], fetch_k, where_clause),
+    )
     if subtopics:
         print(f"[RAG-V2] Extracted {len(subtopics)} Subtopics for diverse search: {subtopics[:5]}")
         subtopic_variants = [QueryVariant(text=st, strategy="subtopic", weight=0.8) for st in subtopics]
         variants.extend(subtopic_variants)
+        variant_results += await _retrieve_variants_async(
+            collection, [v.text for v in subtopic_variants], fetch_k, where_clause
+        )
     
     # Collect candidates across all query variants
     all_candidates = {}  # chunk_id -> {doc, embedding, best_vector_score}
-    
-    for variant in variants:
-        # Try scoped retrieval first
-        docs, ids, embs, dists, metas = _vector_retrieve(
-            collection, variant.text, fetch_k, where_clause
-        )
-        
-        # Fallback to subject-wide if scoped returns nothing
-        if len(docs) == 0 and where_clause is not None:
-            docs, ids, embs, dists, metas = _vector_retrieve(
-                collection, variant.text, fetch_k, None
-            )
-        
-        scores = _distances_to_scores(dists)
-        
+
+    # Flatten the (variant, hit) matrix into candidate indices + weighted scores,
+    # then fold best score / hit count per candidate with NumPy reductions.
+    hit_idx: list[int] = []
+    hit_scores: list[np.ndarray] = []
+    cand_index: dict[str, int] = {}
+    noisy_ids: set[str] = set()
+
+    for variant, (docs, ids, embs, dists, metas) in zip(variants, variant_results):
+        scores = np.zeros(len(ids), dtype=np.float32)
+        n_scored = min(len(ids), len(dists))
+        scores[:n_scored] = _distances_to_scores(dists[:n_scored])
+        scores *= variant.weight
+
+        keep = []
         for i, chunk_id in enumerate(ids):
-            # NOISE FILTER
-            if _is_noisy_chunk(docs[i]):
-                continue
-                
-            weighted_score = scores[i] * variant.weight if i < len(scores) else 0.0
-            meta = metas[i] if i < len(metas) else {}
-            
-            if chunk_id not in all_candidates:
+            if chunk_id not in cand_index:
+                # NOISE FILTER (checked once per chunk)
+                if chunk_id in noisy_ids or _is_noisy_chunk(docs[i]):
+                    noisy_ids.add(chunk_id)
+                    continue
+                meta = metas[i] if i < len(metas) else {}
+                cand_index[chunk_id] = len(cand_index)
                 all_candidates[chunk_id] = {
                     "doc": docs[i],
                     "embedding": embs[i] if i < len(embs) else None,
-                    "best_vector_score": weighted_score,
-                    "variant_hits": 1,
+                    "best_vector_score": 0.0,
+                    "variant_hits": 0,
                     # NEW: locality metadata
                     "page_start": int(meta.get("page_start", 0)) if meta else 0,
                     "page_end": int(meta.get("page_end", 0)) if meta else 0,
@@ -378,20 +484,22 @@ def retrieve_context_for_generation(
                     "material_id": meta.get("material_id", "") if meta else "",
                     "section_heading": meta.get("section_heading", "") if meta else "",
                 }
-            else:
-                # Keep the best score + count how many variants found this chunk
-                existing = all_candidates[chunk_id]
-                existing["best_vector_score"] = max(existing["best_vector_score"], weighted_score)
-                existing["variant_hits"] += 1
-                
-    # Filter noise
-    clean_candidates = {
-        cid: data for cid, data in all_candidates.items()
-        if not _is_noisy_chunk(data["doc"])
-    }
-    if len(clean_candidates) >= n_results:
-        all_candidates = clean_candidates
-    
+            keep.append(i)
+            hit_idx.append(cand_index[chunk_id])
+        hit_scores.append(scores[keep])
+
+    # Keep the best score + count how many variants found each chunk
+    best_vector_score = np.full(len(cand_index), -np.inf, dtype=np.float32)
+    variant_hits = np.zeros(len(cand_index), dtype=np.int32)
+    if hit_idx:
+        inv = np.asarray(hit_idx, dtype=np.intp)
+        np.maximum.at(best_vector_score, inv, np.concatenate(hit_scores))
+        np.add.at(variant_hits, inv, 1)
+    for chunk_id, idx in cand_index.items():
+        all_candidates[chunk_id]["best_vector_score"] = float(best_vector_score[idx])
+        all_candidates[chunk_id]["variant_hits"] = int(variant_hits[idx])
+
+    # Noisy chunks are dropped above before they are stored, so no second pass is needed
     total_candidates = len(all_candidates)
     debug_info["total_candidates"] = total_candidates
     print(f"[RAG-V2] Vector candidates: {total_candidates} (from {len(variants)} queries)")
@@ -403,14 +511,12 @@ def retrieve_context_for_generation(
     candidate_ids = list(all_candidates.keys())
     candidate_docs = [all_candidates[cid]["doc"] for cid in candidate_ids]
     candidate_embs = [all_candidates[cid]["embedding"] for cid in candidate_ids]
-    vector_scores_map = {cid: all_candidates[cid]["best_vector_score"] for cid in candidate_ids}
-    
+
     # Bonus for chunks found by multiple query variants (reinforcement)
-    for cid in candidate_ids:
-        hits = all_candidates[cid]["variant_hits"]
-        if hits > 1:
-            vector_scores_map[cid] *= (1 + 0.05 * (hits - 1))  # 5% bonus per extra hit
-    
+    # 5% bonus per extra hit; candidate_ids follow cand_index order
+    boosted = best_vector_score * (1 + 0.05 * np.maximum(variant_hits - 1, 0))
+    vector_scores_map = {cid: float(boosted[i]) for i, cid in enumerate(candidate_ids)}
+
     debug_info["vector_scores"] = {cid: round(s, 4) for cid, s in list(vector_scores_map.items())[:10]}
     
     # ─── Step 4: BM25 scoring ───
@@ -451,20 +557,14 @@ def retrieve_context_for_generation(
                 
                 ce_start = time.time()
                 
-                cached_ce_scores = []
-                pairs_to_score = []
-                for p in pairs:
-                    cached_score = _redis.get_ce_score(p[0], p[1])
-                    if cached_score is not None:
-                        cached_ce_scores.append(cached_score)
-                    else:
-                        cached_ce_scores.append(None)
-                        pairs_to_score.append(p)
+                cached_ce_scores = await _redis.aget_ce_scores_batch(primary_query, rerank_docs)
+                pairs_to_score = [p for p, cached_score in zip(pairs, cached_ce_scores) if cached_score is None]
                         
                 ce_scores = []
                 if pairs_to_score:
-                    new_scores = cross_encoder.predict(pairs_to_score)
-                    _redis.set_ce_scores_batch(
+                    new_scores = await asyncio.to_thread(cross_encoder.predict, pairs_to_score)
+                    await asyncio.to_thread(
+                        _redis.set_ce_scores_batch,
                         pairs_to_score[0][0], 
                         [p[1] for p in pairs_to_score], 
                         [float(s) for s in new_scores]
@@ -521,7 +621,7 @@ def retrieve_context_for_generation(
         valid_ids = [mmr_ids[i] for i in valid_indices]
         # MMR Re-ranking with diversity lambda_mult=0.4
         if len(valid_embs) > n_results:
-            query_embedding = cached_embedding_fn(variants[0].text)
+            query_embedding = await asyncio.to_thread(cached_embedding_fn, variants[0].text)
             final_docs, final_ids = _mmr_rerank(
                 query_embedding, valid_embs, valid_docs, k=n_results, lambda_mult=0.4, doc_ids=valid_ids
             )
@@ -1,14 +1,225 @@
+import asyncio
+import functools
 import hashlib
 import json
 import logging
-from collections import OrderedDict
+import random
+import struct
+import threading
+import time
+import weakref
+import numpy as np
 try:
     import redis
+    import redis.asyncio
+    from redis.utils import HIREDIS_AVAILABLE
 except ImportError:
     redis = None
+    HIREDIS_AVAILABLE = False
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
 
 logger = logging.getLogger(__name__)
 
+
+# JSON payloads (retrieval results) use orjson when available; it is several
+# times faster than stdlib json and serializes numpy natively.
+if orjson is not None:
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    _loads = orjson.loads
+else:
+    def _dumps(obj):
+        return json.dumps(obj, default=lambda o: o.tolist())
+
+    _loads = json.loads
+
+
+# Embeddings are stored behind a format prefix:
+#   b"\x01" raw float32, b"Z4" LZ4-framed float32 (written when lz4 is installed),
+#   b"Q8" symmetric int8 quantization: <f4 scale followed by int8 values.
+# Legacy JSON entries have no prefix: the emb:* cache treats them as misses, but
+# qemb:* (the 30-day novelty store) still decodes them so no question drops out.
+_EMB_VERSION = b"\x01"
+_EMB_LZ4 = b"Z4"
+_EMB_Q8 = b"Q8"
+
+
+def _is_empty(embedding) -> bool:
+    # len() rather than truthiness: embeddings may be numpy arrays
+    return embedding is None or len(embedding) == 0
+
+
+def _pack_embedding(embedding, quantize: bool = True) -> bytes:
+    arr = np.asarray(embedding, dtype="<f4")
+    if quantize:
+        # ~1% similarity error, 4x smaller than float32
+        max_abs = float(np.max(np.abs(arr))) if arr.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        q = np.round(arr / scale).astype(np.int8)
+        return _EMB_Q8 + struct.pack("<f", scale) + q.tobytes()
+    raw = arr.tobytes()
+    if lz4_frame is not None:
+        return _EMB_LZ4 + lz4_frame.compress(raw, compression_level=1)
+    return _EMB_VERSION + raw
+
+
+def _unpack_embedding(raw: bytes, legacy_json: bool = False):
+    if not raw:
+        return None
+    if raw[:2] == _EMB_Q8:
+        (scale,) = struct.unpack_from("<f", raw, 2)
+        return np.frombuffer(raw, dtype=np.int8, offset=6).astype(np.float32) * np.float32(scale)
+    if raw[:1] == _EMB_VERSION:
+        return np.frombuffer(raw, dtype="<f4", offset=1)
+    if raw[:2] == _EMB_LZ4 and lz4_frame is not None:
+        return np.frombuffer(lz4_frame.decompress(raw[2:]), dtype="<f4")
+    if legacy_json and raw[:1] == b"[":
+        try:
+            return np.asarray(_loads(raw), dtype=np.float32)
+        except ValueError:
+            return None
+    return None
+
+
+def _l1_value(embedding, quantize: bool, packed: bytes | None = None):
+    """What an L2 round-trip would return, so both tiers hand out the same vector."""
+    if not quantize:
+        return embedding
+    return _unpack_embedding(packed if packed is not None else _pack_embedding(embedding, quantize))
+
+
+# Cache keys are non-cryptographic: xxh3_128 is much faster than MD5 on short strings
+if xxhash is not None:
+    @functools.lru_cache(maxsize=16384)
+    def _hash_text(text: str) -> str:
+        return xxhash.xxh3_128_hexdigest(text.encode('utf-8'))
+
+    def _hash_ce_pair(query: str, doc: str) -> str:
+        h = xxhash.xxh3_128(query.encode('utf-8'))
+        h.update(b'|||')
+        h.update(doc.encode('utf-8'))
+        return h.hexdigest()
+else:
+    @functools.lru_cache(maxsize=16384)
+    def _hash_text(text: str) -> str:
+        return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+    def _hash_ce_pair(query: str, doc: str) -> str:
+        return hashlib.md5((query + '|||' + doc).encode('utf-8')).hexdigest()
+
+
+# Cross-encoder scores are stored as b"F4" + float32; older entries are ASCII floats.
+# The tag keeps 4-character ASCII scores ("0.25") from being read as float32.
+_SCORE_F4 = b"F4"
+
+
+def _pack_score(score: float) -> bytes:
+    return _SCORE_F4 + struct.pack("<f", score)
+
+
+def _unpack_score(raw: bytes):
+    if raw is None:
+        return None
+    if len(raw) == 6 and raw[:2] == _SCORE_F4:
+        return struct.unpack_from("<f", raw, 2)[0]
+    try:
+        return float(raw)
+    except ValueError:
+        return None  # untagged binary from an older build: treat as a miss
+
+
+# Key prefixes are formatted once per (subject, topic) instead of on every lookup
+@functools.lru_cache(maxsize=4096)
+def _rag_prefix(subject_id, topic_id) -> str:
+    return f"rag:{subject_id}:{topic_id if topic_id else '0'}:"
+
+
+@functools.lru_cache(maxsize=4096)
+def _qemb_prefix(subject_id, topic_id) -> str:
+    return f"qemb:{subject_id}:{topic_id}:"
+
+
+@functools.lru_cache(maxsize=1024)
+def _lock_key(subject_id) -> str:
+    return f"lock:gen:{subject_id}"
+
+
+class _CounterCache:
+    """
+    Bounded L1 map with a saturating hit counter per entry.
+    Reads only bump the counter (no reordering); on overflow a random sample
+    of entries is inspected and the least-used one is evicted (TinyLFU-style).
+    Shared by generation worker threads and asyncio.to_thread callers, so every
+    operation holds one lock.
+    """
+    _SAMPLE_SIZE = 16
+    _MAX_COUNT = 255
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = {}   # key -> [value, count, slot]
+        self._keys = []   # slot -> key, for O(1) random sampling
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[1] < self._MAX_COUNT:
+                entry[1] += 1
+                if entry[1] == self._MAX_COUNT:
+                    self._age()
+            return entry[0]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                entry[0] = value
+                return
+            if len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = [value, 1, len(self._keys)]
+            self._keys.append(key)
+
+    # _age and _evict are only called with self._lock held
+    def _age(self):
+        # Halve all counters so old popularity decays
+        for entry in self._data.values():
+            entry[1] >>= 1
+
+    def _evict(self):
+        n = len(self._keys)
+        if n == 0:
+            return
+        slots = random.sample(range(n), min(self._SAMPLE_SIZE, n))
+        victim = min((self._keys[i] for i in slots), key=lambda k: self._data[k][1])
+        slot = self._data.pop(victim)[2]
+        last = self._keys.pop()
+        if slot < len(self._keys):
+            self._keys[slot] = last
+            self._data[last][2] = slot
+
+
 class RedisCache:
     _instance = None
 
@@ -21,42 +232,66 @@ class RedisCache:
     def _init_cache(self):
         self.is_available = False
         self.client = None
-        self.l1_cache = OrderedDict()
+        self.bin_client = None
+        self._expire_script = None
+        # Event loop -> binary redis.asyncio client; a pool is bound to the loop that created it
+        self._aclients = weakref.WeakKeyDictionary()
         self.l1_max_size = 10000
+        # Counter-based admission: no write-on-read reordering on L1 hits
+        self.l1_cache = _CounterCache(maxsize=self.l1_max_size)
         self.l1_hits = 0
         self.l1_misses = 0
+        self._mem_cache_ts = float("-inf")
+        self._mem_cache_val = "unknown"
 
         if redis is None:
             logger.warning("[Redis] Redis python package not installed.")
             return
 
         try:
-            self.client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+            self.client = redis.Redis(connection_pool=self._make_pool(decode_responses=True))
             self.client.ping()
+            # Separate non-decoding client for binary embedding payloads
+            self.bin_client = redis.Redis(connection_pool=self._make_pool(decode_responses=False))
+            # Applies one TTL to every key in KEYS, so batch writes are MSET + one script call
+            self._expire_script = self.client.register_script(
+                "for _, k in ipairs(KEYS) do redis.call('EXPIRE', k, ARGV[1]) end"
+            )
             self.is_available = True
-            logger.info("[Redis] Connected successfully.")
+            logger.info(f"[Redis] Connected successfully (hiredis parser: {HIREDIS_AVAILABLE}).")
         except Exception as e:
             logger.warning(f"[Redis] Connection failed: {e}. Falling back to in-memory only (graceful degradation).")
 
-    def _md5(self, text: str) -> str:
-        return hashlib.md5(text.encode('utf-8')).hexdigest()
-
-    def _update_l1(self, key: str, value):
-        self.l1_cache[key] = value
-        self.l1_cache.move_to_end(key)
-        if len(self.l1_cache) > self.l1_max_size:
-            self.l1_cache.popitem(last=False)
+    @staticmethod
+    def _make_pool(decode_responses: bool):
+        # Persistent bounded pool shared by all callers; redis-py already sets
+        # TCP_NODELAY on every connection, keepalive keeps idle sockets warm.
+        # With hiredis installed redis-py picks its C RESP parser by default.
+        return redis.BlockingConnectionPool(
+            host='localhost', port=6379, db=0,
+            decode_responses=decode_responses,
+            max_connections=32,
+            timeout=5,
+            socket_connect_timeout=5,
+            socket_keepalive=True,
+        )
+
+    # Memoized: repeated queries skip re-encoding and re-hashing entirely
+    _hash = staticmethod(_hash_text)
+    _ce_hash = staticmethod(_hash_ce_pair)
 
     # ─── 1A. Two-Tier Embedding Cache ───
 
     def get_embedding(self, text: str):
-        key = f"emb:{self._md5(text)}"
+        if not text:
+            return None
+        key = f"emb:{self._hash(text)}"
         
         # L1 check
-        if key in self.l1_cache:
+        emb = self.l1_cache.get(key)
+        if emb is not None:
             self.l1_hits += 1
-            self.l1_cache.move_to_end(key)
-            return self.l1_cache[key]
+            return emb
         
         self.l1_misses += 1
         
@@ -65,91 +300,153 @@ class RedisCache:
             return None
             
         try:
-            cached = self.client.get(key)
-            if cached:
-                emb = json.loads(cached)
-                self._update_l1(key, emb)
+            emb = _unpack_embedding(self.bin_client.get(key))
+            if emb is not None:
+                self.l1_cache[key] = emb
                 return emb
         except Exception as e:
             logger.warning(f"[Redis] get_embedding failed: {e}")
             
         return None
 
-    def set_embedding(self, text: str, embedding: list[float]):
-        key = f"emb:{self._md5(text)}"
-        self._update_l1(key, embedding)
+    def set_embedding(self, text: str, embedding: list[float], quantize: bool = True):
+        if not text or _is_empty(embedding):
+            return
+        key = f"emb:{self._hash(text)}"
+        packed = _pack_embedding(embedding, quantize)
+        self.l1_cache[key] = _l1_value(embedding, quantize, packed)
         
         if not self.is_available:
             return
             
         try:
-            self.client.set(key, json.dumps(embedding), ex=7 * 24 * 3600)
+            self.bin_client.set(key, packed, ex=7 * 24 * 3600)
         except Exception as e:
             logger.warning(f"[Redis] set_embedding failed: {e}")
 
     def get_embeddings_batch(self, texts: list[str]) -> list:
         results = [None] * len(texts)
-        if not self.is_available:
-            for i, text in enumerate(texts):
-                key = f"emb:{self._md5(text)}"
-                if key in self.l1_cache:
-                    self.l1_hits += 1
-                    self.l1_cache.move_to_end(key)
-                    results[i] = self.l1_cache[key]
-                else:
-                    self.l1_misses += 1
-            return results
 
-        keys_to_fetch = []
-        indices_to_fetch = []
-        
+        # Hash each distinct text once and fan results out to every position
+        positions: dict[str, list[int]] = {}
         for i, text in enumerate(texts):
-            key = f"emb:{self._md5(text)}"
-            if key in self.l1_cache:
+            positions.setdefault(text, []).append(i)
+
+        keys_to_fetch = []
+        texts_to_fetch = []
+
+        for text, idxs in positions.items():
+            key = f"emb:{self._hash(text)}"
+            emb = self.l1_cache.get(key)
+            if emb is not None:
                 self.l1_hits += 1
-                self.l1_cache.move_to_end(key)
-                results[i] = self.l1_cache[key]
+                for i in idxs:
+                    results[i] = emb
             else:
                 self.l1_misses += 1
                 keys_to_fetch.append(key)
-                indices_to_fetch.append(i)
+                texts_to_fetch.append(text)
 
-        if not keys_to_fetch:
+        if not keys_to_fetch or not self.is_available:
             return results
 
         try:
-            cached_vals = self.client.mget(keys_to_fetch)
-            for idx, key, val in zip(indices_to_fetch, keys_to_fetch, cached_vals):
-                if val:
-                    emb = json.loads(val)
-                    self._update_l1(key, emb)
-                    results[idx] = emb
+            cached_vals = self.bin_client.mget(keys_to_fetch)
+            for text, key, val in zip(texts_to_fetch, keys_to_fetch, cached_vals):
+                emb = _unpack_embedding(val)
+                if emb is not None:
+                    self.l1_cache[key] = emb
+                    for i in positions[text]:
+                        results[i] = emb
         except Exception as e:
             logger.warning(f"[Redis] get_embeddings_batch failed: {e}")
 
         return results
 
-    def set_embeddings_batch(self, emb_dict: dict):
-        # emb_dict maps text -> embedding sequence
+    def _get_aclient(self):
+        """Binary asyncio client for the running event loop, created lazily."""
+        loop = asyncio.get_running_loop()
+        aclient = self._aclients.get(loop)
+        if aclient is None:
+            pool = redis.asyncio.BlockingConnectionPool(
+                host='localhost', port=6379, db=0,
+                decode_responses=False,
+                max_connections=32,
+                timeout=5,
+                socket_connect_timeout=5,
+                socket_keepalive=True,
+            )
+            aclient = redis.asyncio.Redis(connection_pool=pool)
+            self._aclients[loop] = aclient
+        return aclient
+
+    async def aclose_aclient(self):
+        """Close the running loop's asyncio client (end of a worker job / app shutdown)."""
+        aclient = self._aclients.pop(asyncio.get_running_loop(), None)
+        if aclient is not None:
+            await aclient.aclose()
+
+    async def aget_embeddings_batch(self, texts: list[str]) -> list:
+        """Async get_embeddings_batch: the MGET can overlap with other awaited work."""
+        results = [None] * len(texts)
+
+        positions: dict[str, list[int]] = {}
+        for i, text in enumerate(texts):
+            positions.setdefault(text, []).append(i)
+
+        keys_to_fetch = []
+        texts_to_fetch = []
+
+        for text, idxs in positions.items():
+            key = f"emb:{self._hash(text)}"
+            emb = self.l1_cache.get(key)
+            if emb is not None:
+                self.l1_hits += 1
+                for i in idxs:
+                    results[i] = emb
+            else:
+                self.l1_misses += 1
+                keys_to_fetch.append(key)
+                texts_to_fetch.append(text)
+
+        if not keys_to_fetch or not self.is_available:
+            return results
+
+        try:
+            cached_vals = await self._get_aclient().mget(keys_to_fetch)
+            for text, key, val in zip(texts_to_fetch, keys_to_fetch, cached_vals):
+                emb = _unpack_embedding(val)
+                if emb is not None:
+                    self.l1_cache[key] = emb
+                    for i in positions[text]:
+                        results[i] = emb
+        except Exception as e:
+            logger.warning(f"[Redis] aget_embeddings_batch failed: {e}")
+
+        return results
+
+    def set_embeddings_batch(self, emb_dict: dict, quantize: bool = True):
+        # emb_dict maps text -> embedding sequence (keys are unique, so each text is hashed once)
         if not emb_dict:
             return
 
         pipeline_data = {}
-        for text, emb in emb_dict.items():
-            key = f"emb:{self._md5(text)}"
-            self._update_l1(key, emb)
+        for text, emb in ((t, e) for t, e in emb_dict.items() if t and not _is_empty(e)):
+            key = f"emb:{self._hash(text)}"
+            packed = _pack_embedding(emb, quantize)
+            self.l1_cache[key] = _l1_value(emb, quantize, packed)
             if self.is_available:
-                pipeline_data[key] = json.dumps(emb)
+                pipeline_data[key] = packed
 
         if not self.is_available or not pipeline_data:
             return
 
         try:
-            pipe = self.client.pipeline()
+            pipe = self.bin_client.pipeline(transaction=False)
             # 7 days TTl
             ttl = 7 * 24 * 3600
-            for key, val in pipeline_data.items():
-                pipe.set(key, val, ex=ttl)
+            pipe.mset(pipeline_data)
+            self._expire_script(keys=list(pipeline_data), args=[ttl], client=pipe)
             pipe.execute()
         except Exception as e:
             logger.warning(f"[Redis] set_embeddings_batch failed: {e}")
@@ -160,7 +457,7 @@ class RedisCache:
         if not self.is_available:
             return True  # Fail-open
         try:
-            key = f"lock:gen:{subject_id}"
+            key = _lock_key(subject_id)
             acquired = self.client.set(key, str(job_id), nx=True, ex=600)
             return bool(acquired)
         except Exception as e:
@@ -171,8 +468,8 @@ class RedisCache:
         if not self.is_available:
             return
         try:
-            key = f"lock:gen:{subject_id}"
-            self.client.delete(key)
+            key = _lock_key(subject_id)
+            self.client.unlink(key)
         except Exception as e:
             logger.warning(f"[Redis] release_generation_lock failed: {e}")
 
@@ -182,23 +479,50 @@ class RedisCache:
         if not self.is_available:
             return None
         try:
-            tid = topic_id if topic_id else "0"
-            key = f"rag:{subject_id}:{tid}:{self._md5(query_text)[:12]}"
+            key = _rag_prefix(subject_id, topic_id) + self._hash(query_text)[:12]
             cached = self.client.get(key)
             if cached:
-                return json.loads(cached)
+                return _loads(cached)
         except Exception as e:
             logger.warning(f"[Redis] get_cached_retrieval failed: {e}")
         return None
 
+    async def aget_cached_retrieval(self, subject_id, topic_id, query_text: str):
+        if not self.is_available:
+            return None
+        try:
+            key = _rag_prefix(subject_id, topic_id) + self._hash(query_text)[:12]
+            cached = await self._get_aclient().get(key)
+            if cached:
+                return _loads(cached)  # orjson and json both accept bytes
+        except Exception as e:
+            logger.warning(f"[Redis] aget_cached_retrieval failed: {e}")
+        return None
+
+    def get_cached_retrievals_batch(self, subject_id, topic_id, query_texts: list[str]) -> list:
+        """One MGET for several queries; prefer this over get_cached_retrieval in a loop."""
+        if not self.is_available or not query_texts:
+            return [None] * len(query_texts)
+        try:
+            prefix = _rag_prefix(subject_id, topic_id)
+            keys = [prefix + self._hash(q)[:12] for q in query_texts]
+            return [_loads(v) if v else None for v in self.client.mget(keys)]
+        except Exception as e:
+            logger.warning(f"[Redis] get_cached_retrievals_batch failed: {e}")
+            return [None] * len(query_texts)
+
     def cache_retrieval(self, subject_id, topic_id, query_text: str, chunks: list[str], chunk_ids: list[str]):
         if not self.is_available:
             return
         try:
-            tid = topic_id if topic_id else "0"
-            key = f"rag:{subject_id}:{tid}:{self._md5(query_text)[:12]}"
-            val = json.dumps({"chunks": chunks, "chunk_ids": chunk_ids})
-            self.client.set(key, val, ex=3600) # 1 hour TTL
+            key = _rag_prefix(subject_id, topic_id) + self._hash(query_text)[:12]
+            val = _dumps({"chunks": chunks, "chunk_ids": chunk_ids})
+            idx_key = f"idx:rag:{subject_id}"
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(key, val, ex=3600) # 1 hour TTL
+            pipe.sadd(idx_key, key)
+            pipe.expire(idx_key, 3600)
+            pipe.execute()
         except Exception as e:
             logger.warning(f"[Redis] cache_retrieval failed: {e}")
 
@@ -206,40 +530,72 @@ class RedisCache:
         if not self.is_available:
             return
         try:
-            pattern = f"rag:{subject_id}:*"
-            cursor = '0'
-            while cursor != 0:
-                cursor, keys = self.client.scan(cursor=cursor, match=pattern, count=100)
-                if keys:
-                    self.client.delete(*keys)
+            # Per-subject index set: O(matches) instead of a keyspace-wide SCAN
+            idx_key = f"idx:rag:{subject_id}"
+            keys = self.client.smembers(idx_key)
+            # UNLINK frees the values in a background thread on the server
+            self.client.unlink(*keys, idx_key)
         except Exception as e:
             logger.warning(f"[Redis] invalidate_retrieval_cache failed: {e}")
 
     # ─── 1D. Novelty / Question Dedup Cache ───
 
-    def add_question_embedding(self, subject_id, topic_id, question_id, embedding: list[float]):
+    def add_question_embedding(self, subject_id, topic_id, question_id, embedding: list[float], quantize: bool = True):
         if not self.is_available:
             return
         try:
-            key = f"qemb:{subject_id}:{topic_id}:{question_id}"
-            self.client.set(key, json.dumps(embedding), ex=30 * 24 * 3600) # 30 days
+            key = f"{_qemb_prefix(subject_id, topic_id)}{question_id}"
+            idx_key = f"idx:qemb:{subject_id}:{topic_id}"
+            ttl = 30 * 24 * 3600 # 30 days
+            pipe = self.bin_client.pipeline(transaction=False)
+            pipe.set(key, _pack_embedding(embedding, quantize), ex=ttl)
+            pipe.sadd(idx_key, key)
+            pipe.expire(idx_key, ttl)
+            pipe.execute()
         except Exception as e:
             logger.warning(f"[Redis] add_question_embedding failed: {e}")
 
+    def _backfill_question_index(self, subject_id, topic_id, idx_key: str):
+        """
+        One SCAN per scope that adds qemb:* keys written before the index existed,
+        guarded by a marker key so later reads skip it.
+        """
+        marker = f"{idx_key}:backfilled"
+        if self.client.exists(marker):
+            return
+        ttl = 30 * 24 * 3600  # older keys have expired by the time the marker does
+        pipe = self.client.pipeline(transaction=False)
+        for key in self.client.scan_iter(match=f"{_qemb_prefix(subject_id, topic_id)}*", count=500):
+            pipe.sadd(idx_key, key)
+        pipe.expire(idx_key, ttl)
+        pipe.set(marker, 1, ex=ttl)
+        pipe.execute()
+
     def get_question_embeddings(self, subject_id, topic_id) -> list:
         if not self.is_available:
             return []
         try:
-            pattern = f"qemb:{subject_id}:{topic_id}:*"
+            idx_key = f"idx:qemb:{subject_id}:{topic_id}"
+            self._backfill_question_index(subject_id, topic_id, idx_key)
             embs = []
-            cursor = '0'
-            while cursor != 0:
-                cursor, keys = self.client.scan(cursor=cursor, match=pattern, count=100)
+            expired = []
+            cursor = 0
+            while True:
+                cursor, keys = self.client.sscan(idx_key, cursor=cursor, count=500)
                 if keys:
-                    vals = self.client.mget(keys)
-                    for val in vals:
-                        if val:
-                            embs.append(json.loads(val))
+                    vals = self.bin_client.mget(keys)
+                    for key, val in zip(keys, vals):
+                        if val is None:
+                            expired.append(key)
+                            continue
+                        emb = _unpack_embedding(val, legacy_json=True)
+                        if emb is not None:
+                            embs.append(emb)
+                if cursor == 0:
+                    break
+            if expired:
+                # Members outlive their keys' TTL; drop them so later MGETs skip dead keys
+                self.client.srem(idx_key, *expired)
             return embs
         except Exception as e:
             logger.warning(f"[Redis] get_question_embeddings failed: {e}")
@@ -251,23 +607,46 @@ class RedisCache:
         if not self.is_available:
             return None
         try:
-            key = f"ce:{self._md5(query + '|||' + doc)}"
-            val = self.client.get(key)
-            if val is not None:
-                return float(val)
+            key = f"ce:{self._ce_hash(query, doc)}"
+            return _unpack_score(self.bin_client.get(key))
         except Exception as e:
             logger.warning(f"[Redis] get_ce_score failed: {e}")
         return None
 
+    def get_ce_scores_batch(self, query: str, docs: list[str]) -> list:
+        """One MGET for all (query, doc) pairs; prefer this over get_ce_score in a loop."""
+        if not self.is_available or not docs:
+            return [None] * len(docs)
+        try:
+            keys = [f"ce:{self._ce_hash(query, doc)}" for doc in docs]
+            return [_unpack_score(v) for v in self.bin_client.mget(keys)]
+        except Exception as e:
+            logger.warning(f"[Redis] get_ce_scores_batch failed: {e}")
+            return [None] * len(docs)
+
+    async def aget_ce_scores_batch(self, query: str, docs: list[str]) -> list:
+        """Async get_ce_scores_batch: the MGET can overlap with other awaited work."""
+        if not self.is_available or not docs:
+            return [None] * len(docs)
+        try:
+            keys = [f"ce:{self._ce_hash(query, doc)}" for doc in docs]
+            return [_unpack_score(v) for v in await self._get_aclient().mget(keys)]
+        except Exception as e:
+            logger.warning(f"[Redis] aget_ce_scores_batch failed: {e}")
+            return [None] * len(docs)
+
     def set_ce_scores_batch(self, query: str, docs: list[str], scores: list[float]):
         if not self.is_available or not docs:
             return
         try:
-            pipe = self.client.pipeline()
             ttl = 24 * 3600 # 1 day TTL
-            for doc, score in zip(docs, scores):
-                key = f"ce:{self._md5(query + '|||' + doc)}"
-                pipe.set(key, str(score), ex=ttl)
+            data = {
+                f"ce:{self._ce_hash(query, doc)}": _pack_score(score)
+                for doc, score in zip(docs, scores)
+            }
+            pipe = self.bin_client.pipeline(transaction=False)
+            pipe.mset(data)
+            self._expire_script(keys=list(data), args=[ttl], client=pipe)
             pipe.execute()
         except Exception as e:
             logger.warning(f"[Redis] set_ce_scores_batch failed: {e}")
@@ -280,11 +659,16 @@ class RedisCache:
         
         mem_used = "unknown"
         if self.is_available:
-            try:
-                info = self.client.info(section='memory')
-                mem_used = info.get('used_memory_human', 'unknown')
-            except:
-                pass
+            # INFO is comparatively expensive server-side; refresh at most every 5s
+            now = time.monotonic()
+            if now - self._mem_cache_ts > 5:
+                try:
+                    info = self.client.info(section='memory')
+                    self._mem_cache_val = info.get('used_memory_human', 'unknown')
+                    self._mem_cache_ts = now
+                except Exception as e:
+                    logger.debug(f"[Redis] get_stats memory info failed: {e}")
+            mem_used = self._mem_cache_val
 
         return {
             "redis_available": self.is_available,
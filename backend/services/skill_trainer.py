@@ -1,11 +1,26 @@
+import os
 import json
 import re
 import asyncio
+import hashlib
+import functools
+import time
+import statistics
+from collections import deque
+import numpy as np
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from sqlalchemy import select, update, func
 from sqlalchemy.orm import Session
-from models import Skill, Subject, VettedQuestion, CourseOutcome, StudyMaterial, TrainingRun, Topic
+from models import Skill, Subject, VettedQuestion, CourseOutcome, StudyMaterial, TrainingRun, Topic, LLMCache, BaselineCache
 from database import SessionLocal
 from services.swarm import check_ollama, call_ollama, resolve_model
+from services.cached_embedding import cached_embedding_fn
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # ──────────────────────────── Constants ────────────────────────────
@@ -33,15 +48,74 @@ BLOOMS_VERBS = {
     "K6": ["design", "create", "develop", "propose"],
 }
 
+_TOPIC_SPLIT_RE = re.compile(r'[\s,\-/]+')
+_TOKEN_RE = re.compile(r"[a-z]+")
+_INFLECTION_SUFFIXES = ("ing", "es", "ed", "s", "d")
+
+# Max in-flight Ollama calls across the trainer; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+
+# Retrains: evaluate the new skill sequentially and stop once it clearly beats or
+# misses the previous version's score (fewer LLM calls, longer wall time)
+SKILL_EVAL_EARLY_STOP = os.getenv("SKILL_EVAL_EARLY_STOP", "0") == "1"
+
+# Approved example text is capped at this many chars in the SKILL.md prompt
+MAX_EXAMPLE_CHARS = 300
+
+# Cosine similarity above which a cached response is reused for a new prompt
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# Cached responses older than this are ignored and pruned
+LLM_CACHE_MAX_AGE = timedelta(days=30)
+
+# Cached baseline scores older than this are re-measured (the model may have been re-pulled)
+BASELINE_CACHE_MAX_AGE = timedelta(days=7)
+
 
 # ──────────────────────────── Helpers ──────────────────────────────
 
-def append_log(db: Session, skill_id: int, message: str):
-    skill = db.query(Skill).get(skill_id)
-    ist_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
-    timestamp = ist_time.strftime("%H:%M:%S")
-    skill.training_log = (skill.training_log or "") + f"\n[{timestamp}] {message}"
-    db.commit()
+_IST_OFFSET_SECS = 5 * 3600 + 30 * 60
+
+
+class LogBuffer:
+    """
+    Buffers training log lines and appends them to Skill.training_log with a
+    single SQL concat per flush, instead of re-reading and rewriting the whole
+    log for every line. flush() also commits any pending changes on `db`.
+    """
+
+    def __init__(self, db: Session, skill_id: int, flush_every: int = 5):
+        self.db = db
+        self.skill_id = skill_id
+        self.flush_every = flush_every
+        self._pending: list[str] = []
+
+    def append(self, message: str):
+        timestamp = time.strftime("%H:%M:%S", time.gmtime(time.time() + _IST_OFFSET_SECS))
+        self._pending.append(f"\n[{timestamp}] {message}")
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            chunk = "".join(self._pending)
+            self._pending.clear()
+            self.db.execute(
+                update(Skill)
+                .where(Skill.id == self.skill_id)
+                .values(training_log=func.coalesce(Skill.training_log, "") + chunk)
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+
+
+@functools.lru_cache(maxsize=1024)
+def _bigram_codes(text: str) -> np.ndarray:
+    """Sorted unique character bigrams of `text`, each packed into one uint64."""
+    cps = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if cps.size < 2:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique((cps[:-1] << np.uint64(32)) | cps[1:])
 
 
 def simple_similarity(s1: str, s2: str) -> float:
@@ -51,39 +125,219 @@ def simple_similarity(s1: str, s2: str) -> float:
     s1, s2 = s1.lower().strip(), s2.lower().strip()
     if s1 == s2:
         return 1.0
-    bigrams1 = set(s1[i:i+2] for i in range(len(s1)-1))
-    bigrams2 = set(s2[i:i+2] for i in range(len(s2)-1))
-    if not bigrams1 or not bigrams2:
+    bigrams1 = _bigram_codes(s1)
+    bigrams2 = _bigram_codes(s2)
+    if not bigrams1.size or not bigrams2.size:
         return 0.0
-    intersection = bigrams1 & bigrams2
-    union = bigrams1 | bigrams2
-    return len(intersection) / len(union)
+    intersection = np.intersect1d(bigrams1, bigrams2, assume_unique=True).size
+    union = bigrams1.size + bigrams2.size - intersection
+    return intersection / union
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+# LLM outputs beyond this are runaway generations — don't spend time parsing them
+MAX_JSON_PARSE_CHARS = 100_000
 
 
 def safe_parse_json(text: str):
     """Try to extract a JSON object from LLM output."""
-    if not text:
+    if not text or len(text) > MAX_JSON_PARSE_CHARS:
         return None
+    stripped = text.strip()
     try:
-        return json.loads(text.strip())
-    except json.JSONDecodeError:
+        return orjson.loads(stripped) if orjson else json.loads(stripped)
+    except ValueError:  # orjson.JSONDecodeError and json.JSONDecodeError both subclass it
         pass
-    # Find first { ... } block
+    # Decode the first { ... } block in C; raw_decode ignores any trailing text
     start = text.find("{")
     if start == -1:
         return None
-    depth = 0
-    for i in range(start, len(text)):
-        if text[i] == "{":
-            depth += 1
-        elif text[i] == "}":
-            depth -= 1
-        if depth == 0:
-            try:
-                return json.loads(text[start:i+1])
-            except json.JSONDecodeError:
-                break
-    return None
+    try:
+        obj, _ = _JSON_DECODER.raw_decode(text, start)
+        return obj
+    except json.JSONDecodeError:
+        return None
+
+
+# ──────────────────────── LLM Response Cache ────────────────────────
+
+def _sha256(*parts: str) -> str:
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _embed_unit(text: str) -> np.ndarray:
+    vec = np.asarray(cached_embedding_fn(text), dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def _cache_lookup(key: str, scope: str, query_vec: np.ndarray | None) -> str | None:
+    db = SessionLocal()
+    try:
+        fresh = LLMCache.created_at >= datetime.utcnow() - LLM_CACHE_MAX_AGE
+        hit = db.query(LLMCache.response).filter(LLMCache.key == key, fresh).first()
+        if hit:
+            return hit[0]
+        if query_vec is None:
+            return None
+        rows = db.query(LLMCache.embedding, LLMCache.response).filter(
+            LLMCache.scope == scope, LLMCache.embedding.isnot(None), fresh
+        ).all()
+        if not rows:
+            return None
+        matrix = np.stack([np.frombuffer(r[0], dtype=np.float32) for r in rows])
+        sims = matrix @ query_vec
+        best = int(np.argmax(sims))
+        if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return rows[best][1]
+        return None
+    finally:
+        db.close()
+
+
+def _cache_store(key: str, scope: str, model: str, prompt: str, vec: np.ndarray | None, response: str):
+    db = SessionLocal()
+    try:
+        if db.query(LLMCache.id).filter(LLMCache.key == key).first():
+            return
+        db.add(LLMCache(
+            key=key, scope=scope, model=model, prompt_text=prompt,
+            embedding=vec.tobytes() if vec is not None else None,
+            response=response,
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+def purge_expired_llm_cache():
+    """Delete cached responses older than LLM_CACHE_MAX_AGE (lookups already ignore them)."""
+    db = SessionLocal()
+    try:
+        db.query(LLMCache).filter(
+            LLMCache.created_at < datetime.utcnow() - LLM_CACHE_MAX_AGE
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+class OllamaLimiter:
+    """
+    Concurrency cap for Ollama calls that backs off under contention.
+    Tracks a rolling p50 of call latency; when it exceeds 2x the best p50 seen,
+    the cap drops by one (queueing on the server, not throughput, is growing).
+    It climbs back towards `max_limit` once latency recovers.
+    """
+
+    def __init__(self, max_limit: int, window: int = 8):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self._active = 0
+        self._cond: asyncio.Condition | None = None
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._best_p50: float | None = None
+
+    async def run(self, coro_fn, *args, **kwargs):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        start = time.perf_counter()
+        try:
+            return await coro_fn(*args, **kwargs)
+        finally:
+            self._record(time.perf_counter() - start)
+            async with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _record(self, latency: float):
+        self._latencies.append(latency)
+        if len(self._latencies) < self._latencies.maxlen:
+            return
+        p50 = statistics.median(self._latencies)
+        if self._best_p50 is None or p50 < self._best_p50:
+            self._best_p50 = p50
+        if p50 > 2 * self._best_p50 and self.limit > 1:
+            self.limit -= 1
+            self._latencies.clear()
+        elif p50 <= 1.2 * self._best_p50 and self.limit < self.max_limit:
+            self.limit += 1
+            self._latencies.clear()
+
+
+ollama_limiter = OllamaLimiter(OLLAMA_NUM_PARALLEL)
+
+
+# Single-flight: concurrent callers with the same key share one underlying call
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def cached_call_ollama(
+    model: str, prompt: str, system: str = "", semantic_text: str | None = None,
+    scope_parts: tuple[str, ...] = (),
+) -> tuple[str, float]:
+    """
+    call_ollama with a persistent response cache.
+    Exact hits match on sha256(model|system|prompt). If `semantic_text` is given
+    (the part of the prompt that varies between calls), near-duplicates of it are
+    also served from cache, but only among prompts sharing the same remainder and
+    the same `scope_parts` — the fields a near-duplicate must still match exactly
+    (e.g. question type and Bloom level, which differ by a word or two in the text).
+    Identical prompts already in flight are awaited rather than re-sent.
+    """
+    key = _sha256(model, system, prompt)
+    pending = _inflight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await _cached_call(key, model, prompt, system, semantic_text, scope_parts)
+        fut.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved so an unawaited failure isn't logged twice
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def _cached_call(
+    key: str, model: str, prompt: str, system: str, semantic_text: str | None,
+    scope_parts: tuple[str, ...],
+) -> tuple[str, float]:
+    vec = None
+    if semantic_text:
+        scope = _sha256(model, system, prompt.replace(semantic_text, ""), *scope_parts)
+        try:
+            vec = await asyncio.to_thread(_embed_unit, semantic_text)
+        except Exception as e:
+            # Embedding is only needed for near-duplicate hits; exact-key lookup still works
+            print(f"[LLM Cache] Embedding failed, exact-match lookup only: {e}")
+    else:
+        scope = _sha256(model, system, *scope_parts)
+
+    cached = await asyncio.to_thread(_cache_lookup, key, scope, vec)
+    if cached is not None:
+        return cached, 0.0
+
+    response, elapsed = await ollama_limiter.run(call_ollama, model, prompt, system=system)
+    if response and not response.startswith("[ERROR]"):
+        await asyncio.to_thread(_cache_store, key, scope, model, prompt, vec, response)
+    return response, elapsed
 
 
 # ──────────────── Evaluation Criteria (Change 2) ──────────────────
@@ -113,26 +367,43 @@ def check_structural_validity(output_json: dict | None, question_type: str) -> i
     return 1
 
 
-def check_topic_relevance(output_json: dict | None, topic_name: str) -> int:
+@functools.lru_cache(maxsize=256)
+def _topic_words(topic_name: str) -> frozenset[str]:
+    return frozenset(
+        t for w in _TOPIC_SPLIT_RE.split(topic_name.lower()) for t in _TOKEN_RE.findall(w) if len(t) > 2
+    )
+
+
+def question_tokens(output_json: dict | None) -> frozenset[str] | None:
+    """
+    Lowercased word tokens of the question text, plus suffix-stripped variants
+    (-s/-es/-d/-ed/-ing) so "explains"/"explained" still match "explain".
+    None when there is no parsed output to score.
+    """
+    if not output_json or not isinstance(output_json, dict):
+        return None
+    tokens = set()
+    for t in _TOKEN_RE.findall((output_json.get("question_text", "") or "").lower()):
+        tokens.add(t)
+        for suffix in _INFLECTION_SUFFIXES:
+            if t.endswith(suffix) and len(t) - len(suffix) > 2:
+                tokens.add(t[:-len(suffix)])
+    return frozenset(tokens)
+
+
+def check_topic_relevance(tokens: frozenset[str] | None, topic_name: str) -> int:
     """0 or 1: Does the question text contain at least one keyword from the topic?"""
-    if not output_json or not topic_name:
+    if tokens is None or not topic_name:
         return 0
-    q_text = (output_json.get("question_text", "") or "").lower()
-    # Split topic name into words and check if any appears in question
-    topic_words = [w.lower().strip() for w in re.split(r'[\s,\-/]+', topic_name) if len(w) > 2]
+    topic_words = _topic_words(topic_name)
     if not topic_words:
         return 1  # Can't check, give benefit of doubt
-    for w in topic_words:
-        if w in q_text:
-            return 1
-    return 0
+    return 0 if tokens.isdisjoint(topic_words) else 1
 
 
-def check_blooms_alignment(output_json: dict | None, blooms_level: str) -> int:
-    """0 or 1: Does the question contain verbs appropriate for the expected Bloom's level?"""
-    if not output_json or not blooms_level:
-        return 0
-    q_text = (output_json.get("question_text", "") or "").lower()
+@functools.lru_cache(maxsize=64)
+def _verbs_for(blooms_level: str) -> frozenset[str]:
+    """Resolve a Bloom's label (incl. aliases / partial names) to its verb set."""
     verbs = BLOOMS_VERBS.get(blooms_level, [])
     if not verbs:
         # Try partial match (e.g., "Application" matches "Apply")
@@ -140,60 +411,194 @@ def check_blooms_alignment(output_json: dict | None, blooms_level: str) -> int:
             if key.lower().startswith(blooms_level.lower()[:4]):
                 verbs = v_list
                 break
+    return frozenset(verbs)
+
+
+def check_blooms_alignment(tokens: frozenset[str] | None, blooms_level: str) -> int:
+    """0 or 1: Does the question contain verbs appropriate for the expected Bloom's level?"""
+    if tokens is None or not blooms_level:
+        return 0
+    verbs = _verbs_for(blooms_level)
     if not verbs:
         return 0
-    for verb in verbs:
-        if verb in q_text:
-            return 1
-    return 0
+    return 0 if tokens.isdisjoint(verbs) else 1
+
 
+def approved_features(approved_texts: list[str]) -> list[tuple[str, np.ndarray]]:
+    """Normalise approved texts and extract their bigram codes once per evaluation."""
+    feats = []
+    for t in approved_texts:
+        if t:
+            norm = t.lower().strip()
+            feats.append((norm, _bigram_codes(norm)))
+    return feats
 
-def check_non_duplication(output_json: dict | None, approved_texts: list[str]) -> int:
+
+def check_non_duplication(output_json: dict | None, approved: list[tuple[str, np.ndarray]]) -> int:
     """0 or 1: Generated question is NOT >90% similar to any approved example."""
     if not output_json:
         return 0
     q_text = output_json.get("question_text", "") or ""
     if not q_text:
         return 0
-    for approved in approved_texts:
-        if simple_similarity(q_text, approved) > 0.90:
+    q_norm = q_text.lower().strip()
+    q_codes = _bigram_codes(q_norm)
+    for a_norm, a_codes in approved:
+        if a_norm == q_norm:
+            return 0
+        if not q_codes.size or not a_codes.size:
+            continue
+        # Jaccard can't exceed the size ratio — skip the intersect when it can't pass
+        lo, hi = sorted((q_codes.size, a_codes.size))
+        if lo <= 0.90 * hi:
+            continue
+        inter = np.intersect1d(q_codes, a_codes, assume_unique=True).size
+        if inter / (q_codes.size + a_codes.size - inter) > 0.90:
             return 0  # Too similar — deduct
     return 1
 
 
+def score_all(parsed: dict | None, case: dict, approved: list[tuple[str, np.ndarray]]) -> dict:
+    """Run the 4 evaluation criteria for one generated output."""
+    tokens = question_tokens(parsed)
+    return {
+        "structural_validity": check_structural_validity(parsed, case.get("question_type", "MCQ")),
+        "topic_relevance": check_topic_relevance(tokens, case.get("topic_name", "")),
+        "blooms_alignment": check_blooms_alignment(tokens, case.get("blooms_level", "")),
+        "non_duplication": check_non_duplication(parsed, approved),
+    }
+
+
 # ──────────────── Test Case Builder (Change 2) ────────────────────
 
-def build_test_cases(db: Session, subject_id: int) -> list[dict]:
-    approved = db.query(VettedQuestion).filter(
+# Columns the trainer reads — fetched via Core selects as row mappings
+_VQ_COLUMNS = (
+    VettedQuestion.id, VettedQuestion.question_text, VettedQuestion.question_type,
+    VettedQuestion.blooms_level, VettedQuestion.options, VettedQuestion.correct_answer,
+    VettedQuestion.faculty_feedback, VettedQuestion.co_mappings, VettedQuestion.topic_id,
+)
+_CO_COLUMNS = (
+    CourseOutcome.id, CourseOutcome.code, CourseOutcome.description,
+    CourseOutcome.blooms_level, CourseOutcome.blooms_levels,
+)
+
+
+@dataclass
+class SubjectCorpus:
+    """Everything the test-case builder and SKILL.md formatters read for one subject."""
+    recent_approved: list      # newest approved vetted questions (test cases)
+    top_approved: list         # highest-confidence approved vetted questions (prompt examples)
+    rejected: list             # newest rejected vetted questions with a reason
+    subject_cos: list          # course outcomes of the subject, for the CO context
+    cos_by_id: dict            # every CO referenced above, by id
+    topics_by_id: dict         # every topic referenced by recent_approved, by id
+    materials: list            # study material heads for the study summary
+
+    def co_codes(self, vq) -> list[str]:
+        return [self.cos_by_id[cid]["code"] for cid in (vq["co_mappings"] or []) if cid in self.cos_by_id]
+
+
+def load_subject_corpus(
+    db: Session, subject_id: int,
+    max_test_cases: int = 15, max_approved_examples: int = 5,
+    max_rejected_examples: int = 3, max_materials: int = 3,
+) -> SubjectCorpus:
+    """
+    Fetch the subject's training inputs once; the helpers below only format them.
+    Read-only, so rows come back as plain mappings of just the needed columns
+    (no ORM identity map, and nothing for a later commit to expire).
+    """
+    def rows(stmt) -> list:
+        return db.execute(stmt).mappings().all()
+
+    approved = select(*_VQ_COLUMNS).where(
         VettedQuestion.subject_id == subject_id,
         VettedQuestion.verdict == "approved"
-    ).order_by(VettedQuestion.reviewed_at.desc()).limit(15).all()
+    )
+    recent_approved = rows(approved.order_by(VettedQuestion.reviewed_at.desc()).limit(max_test_cases))
+    top_approved = rows(approved.order_by(
+        VettedQuestion.confidence_score.desc().nullslast(),
+        VettedQuestion.reviewed_at.desc()
+    ).limit(max_approved_examples))
+
+    rejected = rows(select(*_VQ_COLUMNS, VettedQuestion.rejection_reason).where(
+        VettedQuestion.subject_id == subject_id,
+        VettedQuestion.verdict == "rejected",
+        VettedQuestion.rejection_reason.isnot(None)
+    ).order_by(VettedQuestion.reviewed_at.desc()).limit(max_rejected_examples))
+
+    # Subject COs double as the lookup table; only fetch mapped ids outside it
+    subject_cos = rows(select(*_CO_COLUMNS).where(CourseOutcome.subject_id == subject_id))
+    cos_by_id = {co["id"]: co for co in subject_cos}
+    missing_co_ids = {
+        cid for vq in recent_approved + top_approved for cid in (vq["co_mappings"] or [])
+    } - cos_by_id.keys()
+    if missing_co_ids:
+        cos_by_id.update(
+            (co["id"], co) for co in rows(select(*_CO_COLUMNS).where(CourseOutcome.id.in_(missing_co_ids)))
+        )
+
+    topic_ids = {vq["topic_id"] for vq in recent_approved if vq["topic_id"]}
+    topics_by_id = {}
+    if topic_ids:
+        topics_by_id = {t["id"]: t for t in rows(select(Topic.id, Topic.title).where(Topic.id.in_(topic_ids)))}
+
+    # Only the head of each material feeds the summary — don't pull whole documents
+    materials = rows(select(
+        func.substr(StudyMaterial.content_text, 1, 200).label("content_text")
+    ).where(StudyMaterial.subject_id == subject_id).limit(max_materials))
+
+    return SubjectCorpus(
+        recent_approved=recent_approved,
+        top_approved=top_approved,
+        rejected=rejected,
+        subject_cos=subject_cos,
+        cos_by_id=cos_by_id,
+        topics_by_id=topics_by_id,
+        materials=materials,
+    )
+
+
+def hash_test_cases(test_cases: list[dict]) -> str:
+    """sha256 over every test-case field score_all (and the prompt) depends on."""
+    fields = [
+        {
+            "input": c["input"],
+            "topic_name": c.get("topic_name", ""),
+            "question_type": c.get("question_type", ""),
+            "blooms_level": c.get("blooms_level", ""),
+            "co_codes": c.get("co_codes", []),
+            "all_approved_texts": c.get("all_approved_texts", []),
+        }
+        for c in test_cases
+    ]
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def build_test_cases(corpus: SubjectCorpus) -> list[dict]:
+    approved = corpus.recent_approved
 
     test_cases = []
-    approved_texts = [vq.question_text for vq in approved if vq.question_text]
+    approved_texts = [vq["question_text"] for vq in approved if vq["question_text"]]
 
     for vq in approved:
         # Resolve COs
-        co_codes = []
-        if vq.co_mappings:
-            cos = db.query(CourseOutcome).filter(CourseOutcome.id.in_(vq.co_mappings)).all()
-            co_codes = [co.code for co in cos]
+        co_codes = corpus.co_codes(vq)
 
         # Get Topic Title
         topic_title = "General"
-        if vq.topic_id:
-            top = db.query(Topic).get(vq.topic_id)
-            if top:
-                topic_title = top.title
+        top = corpus.topics_by_id.get(vq["topic_id"])
+        if top:
+            topic_title = top["title"]
 
         test_case = {
-            "input": f"Generate a {vq.question_type} question about '{topic_title}' "
-                     f"that maps to {', '.join(co_codes)} at {vq.blooms_level or 'Application'} level",
+            "input": f"Generate a {vq['question_type']} question about '{topic_title}' "
+                     f"that maps to {', '.join(co_codes)} at {vq['blooms_level'] or 'Application'} level",
             "topic_name": topic_title,
-            "question_type": vq.question_type or "MCQ",
-            "blooms_level": vq.blooms_level or "Application",
+            "question_type": vq["question_type"] or "MCQ",
+            "blooms_level": vq["blooms_level"] or "Application",
             "co_codes": co_codes,
-            "source_question_text": vq.question_text,
+            "source_question_text": vq["question_text"],
         }
         test_cases.append(test_case)
 
@@ -206,62 +611,44 @@ def build_test_cases(db: Session, subject_id: int) -> list[dict]:
 
 # ──────────── Formatting for SKILL.md Prompt (Change 1) ───────────
 
-def format_approved_examples(db: Session, subject_id: int, max_examples: int = 5) -> str:
-    """Top 5 approved examples, complete with options/answers."""
-    vqs = db.query(VettedQuestion).filter(
-        VettedQuestion.subject_id == subject_id,
-        VettedQuestion.verdict == "approved"
-    ).order_by(
-        VettedQuestion.confidence_score.desc().nullslast(),
-        VettedQuestion.reviewed_at.desc()
-    ).limit(max_examples).all()
-
+def format_approved_examples(corpus: SubjectCorpus) -> str:
+    """Top approved examples, complete with options/answers."""
     output = []
-    for i, vq in enumerate(vqs):
-        co_codes = []
-        if vq.co_mappings:
-            cos = db.query(CourseOutcome).filter(CourseOutcome.id.in_(vq.co_mappings)).all()
-            co_codes = [c.code for c in cos]
-
-        item = f"Example {i+1} [{vq.question_type}] [Bloom's: {vq.blooms_level}] COs: {', '.join(co_codes)}\n"
-        item += f"Q: {vq.question_text}\n"
-        if vq.options and isinstance(vq.options, list):
-            for j, opt in enumerate(vq.options):
+    for i, vq in enumerate(corpus.top_approved):
+        co_codes = corpus.co_codes(vq)
+
+        item = f"Example {i+1} [{vq['question_type']}] [Bloom's: {vq['blooms_level']}] COs: {', '.join(co_codes)}\n"
+        item += f"Q: {(vq['question_text'] or '')[:MAX_EXAMPLE_CHARS]}\n"
+        if vq["options"] and isinstance(vq["options"], list):
+            for j, opt in enumerate(vq["options"]):
                 item += f"  {chr(65+j)}) {opt}\n"
-        if vq.correct_answer:
-            item += f"Correct Answer: {vq.correct_answer}\n"
-        if vq.faculty_feedback:
-            item += f"Faculty Note: {vq.faculty_feedback}\n"
+        if vq["correct_answer"]:
+            item += f"Correct Answer: {vq['correct_answer']}\n"
+        if vq["faculty_feedback"]:
+            item += f"Faculty Note: {vq['faculty_feedback']}\n"
         output.append(item)
 
     return "\n".join(output)
 
 
-def format_rejected_examples(db: Session, subject_id: int, max_examples: int = 3) -> str:
-    """Top 3 rejected examples with clearest rejection reasons."""
-    vqs = db.query(VettedQuestion).filter(
-        VettedQuestion.subject_id == subject_id,
-        VettedQuestion.verdict == "rejected",
-        VettedQuestion.rejection_reason.isnot(None)
-    ).order_by(VettedQuestion.reviewed_at.desc()).limit(max_examples).all()
-
+def format_rejected_examples(corpus: SubjectCorpus) -> str:
+    """Recent rejected examples with clearest rejection reasons."""
     output = []
-    for i, vq in enumerate(vqs):
-        item = f"Rejected {i+1} [{vq.question_type}] — Reason: {vq.rejection_reason}\n"
-        item += f"Q: {vq.question_text}\n"
-        if vq.faculty_feedback:
-            item += f"Faculty Note: {vq.faculty_feedback}\n"
+    for i, vq in enumerate(corpus.rejected):
+        item = f"Rejected {i+1} [{vq['question_type']}] — Reason: {vq['rejection_reason']}\n"
+        item += f"Q: {vq['question_text']}\n"
+        if vq["faculty_feedback"]:
+            item += f"Faculty Note: {vq['faculty_feedback']}\n"
         output.append(item)
 
     return "\n".join(output)
 
 
-def format_co_context(db: Session, subject_id: int) -> str:
-    cos = db.query(CourseOutcome).filter(CourseOutcome.subject_id == subject_id).all()
+def format_co_context(corpus: SubjectCorpus) -> str:
     lines = []
-    for co in cos:
+    for co in corpus.subject_cos:
         # Get matching verbs for all this CO's Bloom's levels
-        b_levels = co.blooms_levels if co.blooms_levels else [co.blooms_level]
+        b_levels = co["blooms_levels"] if co["blooms_levels"] else [co["blooms_level"]]
         all_verbs = []
         for bl in b_levels:
             verbs = BLOOMS_VERBS.get(bl, [])[:3] # 3 verbs per level
@@ -269,12 +656,107 @@ def format_co_context(db: Session, subject_id: int) -> str:
         
         verb_str = ", ".join(list(set(all_verbs))) if all_verbs else "N/A"
         level_str = "/".join(b_levels)
-        lines.append(f"{co.code}: {co.description} → {level_str} → verbs: {verb_str}")
+        lines.append(f"{co['code']}: {co['description']} → {level_str} → verbs: {verb_str}")
     return "\n".join(lines)
 
 
+def format_study_summary(corpus: SubjectCorpus) -> str:
+    """Study summary: 2-3 sentences only."""
+    summaries = []
+    for m in corpus.materials:
+        if m["content_text"]:
+            # Take first 200 chars as a brief summary
+            brief = m["content_text"][:200].replace("\n", " ").strip()
+            summaries.append(brief)
+    return " ".join(summaries)[:400] if summaries else "No study materials available."
+
+
 # ──────────────── SKILL.md Generation (Change 1) ──────────────────
 
+# Per-section prompts for parallel SKILL.md generation. Each one only sees the
+# inputs its section needs; the heading is added locally when assembling.
+_SECTION_PREAMBLE = """You are writing ONE section of a concise instruction document that tells an AI how to generate OBE exam questions for:
+
+SUBJECT: {subject_name} ({subject_code})
+
+"""
+
+_SECTION_SUFFIX = """
+RULES:
+- Output ONLY the section body as markdown. Do NOT repeat the section heading.
+- No JSON. No code fences.
+- Be concrete and actionable, not descriptive
+"""
+
+SKILL_SECTIONS = [
+    ("## 1. Subject Scope", """INPUT DATA — Study Material Summary:
+{study_summary}
+
+INPUT DATA — Course Outcomes:
+{co_context}
+
+Write the "Subject Scope" section (3 lines max):
+- One sentence: what this subject covers
+- Comma-separated list of 4-5 major topics
+"""),
+    ("## 2. CO-Bloom's Reference", """INPUT DATA — Course Outcomes:
+{co_context}
+
+Write the "CO-Bloom's Reference" section:
+List each CO on one line with its Bloom's level and 3-4 action verbs.
+Do NOT mix question types here — COs are WHAT to test, not HOW.
+"""),
+    ("## 3. Format Rules", """Write the "Format Rules" section (max 3 bullets per type):
+- MCQ: exactly 4 options, 1 correct, question under 2 sentences, distractors: one misconception + one related-but-wrong + one opposite
+- Short Notes: exactly 3-5 key points, first=definition, last=application
+- Essay: 3-part structure (intro/body/conclusion), 300-500 words, reference specific concepts
+"""),
+    ("## 4. Faculty Rules", """INPUT DATA — Faculty-Approved Examples:
+{approved_examples}
+
+INPUT DATA — Faculty-Rejected Examples:
+{rejected_examples}
+
+Write the "Faculty Rules" section (max 5 bullets total):
+Extract 3 DO rules from the best approved examples (one concrete pattern each).
+Extract 2 DON'T rules from rejected examples (with the rejection reason).
+Each rule = one sentence. Be specific, not vague.
+"""),
+    ("## 5. Gold Examples", """INPUT DATA — Faculty-Approved Examples:
+{approved_examples}
+
+Write the "Gold Examples" section (exactly 3: one MCQ, one Short Notes, one Essay):
+Pick the BEST approved example for each type. Show COMPLETE question with all options/answers.
+If an example is incomplete, skip it and write a model example based on the approved patterns.
+"""),
+]
+
+
+def _strip_echoed_heading(body: str) -> str:
+    """Drop a leading '## ...' line if the model repeated the section heading."""
+    body = body.strip()
+    if body.startswith("#"):
+        body = body.split("\n", 1)[1].strip() if "\n" in body else ""
+    return body
+
+
+async def _generate_skill_sections(model: str, inputs: dict) -> str | None:
+    """Generate all SKILL.md sections concurrently; None if any section fails."""
+    prompts = [
+        _SECTION_PREAMBLE.format(**inputs) + tmpl.format(**inputs) + _SECTION_SUFFIX
+        for _, tmpl in SKILL_SECTIONS
+    ]
+    outputs = await asyncio.gather(*[cached_call_ollama(model, p) for p in prompts])
+
+    parts = []
+    for (heading, _), (text, _) in zip(SKILL_SECTIONS, outputs):
+        body = _strip_echoed_heading(text or "")
+        if not body or text.startswith("[ERROR]"):
+            return None
+        parts.append(f"{heading}\n{body}")
+    return "\n\n".join(parts)
+
+
 async def generate_skill_content(
     subject_name: str,
     subject_code: str,
@@ -286,8 +768,22 @@ async def generate_skill_content(
     available_models: list
 ) -> tuple[str, float]:
 
-    start_time = datetime.now()
-
+    start_time = time.perf_counter()
+
+    # Sections are independent — decode them in parallel, each with a smaller prompt
+    content = await _generate_skill_sections(model, {
+        "subject_name": subject_name,
+        "subject_code": subject_code,
+        "approved_examples": approved_examples,
+        "rejected_examples": rejected_examples,
+        "co_context": co_context,
+        "study_summary": study_summary,
+    })
+    if content is not None:
+        elapsed = time.perf_counter() - start_time
+        return content, elapsed
+
+    print("[SkillTrainer] Section generation failed, falling back to single prompt")
     prompt = f"""You must generate a CONCISE instruction document (UNDER 600 words total) for an AI to generate OBE exam questions for:
 
 SUBJECT: {subject_name} ({subject_code})
@@ -334,8 +830,8 @@ RULES:
 - Be concrete and actionable, not descriptive
 """
 
-    response_text, call_time = await call_ollama(model, prompt)
-    elapsed = (datetime.now() - start_time).total_seconds()
+    response_text, call_time = await cached_call_ollama(model, prompt)
+    elapsed = time.perf_counter() - start_time
 
     return response_text, elapsed
 
@@ -348,63 +844,99 @@ async def evaluate_with_skill(
     subject_id: int,
     model: str,
     available_models: list,
-    use_skill: bool
+    use_skill: bool,
+    early_stop_threshold: float | None = None,
 ) -> dict:
-
-    results = []
-
-    for case in test_cases:
-        system_prompt = "You are an expert exam question setter. Follow OBE and academic standards."
-        user_prompt = ""
-
-        if use_skill and skill_content:
-            user_prompt = f"""GENERATION GUIDELINES (from faculty training):
-{skill_content}
-
----
-"""
-        user_prompt += f"""{case["input"]}
+    """
+    Score the model on every test case, with or without the skill document.
+    With `early_stop_threshold`, cases run one at a time and evaluation stops as
+    soon as the final success rate can no longer land on the other side of the
+    threshold. The result is then flagged `partial` and `success_rate` is the
+    bound that settled it (lower bound on a pass, upper bound on a miss), not
+    the mean of the evaluated prefix.
+    """
+
+    system_prompt = "You are an expert exam question setter. Follow OBE and academic standards."
+    if use_skill and skill_content:
+        # Identical for every case, so Ollama can reuse the prompt prefix across calls
+        system_prompt += f"""
+
+GENERATION GUIDELINES (from faculty training):
+{skill_content}"""
+
+    # build_test_cases attaches the same approved list to every case — featurise it once
+    features_by_list: dict[int, list] = {}
+    case_features = []
+    for c in test_cases:
+        texts = c.get("all_approved_texts") or []
+        if id(texts) not in features_by_list:
+            features_by_list[id(texts)] = approved_features(texts)
+        case_features.append(features_by_list[id(texts)])
+
+    async def _run_one(case: dict, approved: list) -> dict:
+        user_prompt = f"""{case["input"]}
 
 Output valid JSON only with keys: question_text, options (for MCQ), correct_answer, key_points (for Short Notes), expected_structure (for Essay).
 Do NOT wrap in markdown. RAW JSON only."""
 
-        start = datetime.now()
-        output, call_time = await call_ollama(model, user_prompt, system=system_prompt)
-        elapsed = (datetime.now() - start).total_seconds()
+        start = time.perf_counter()
+        output, call_time = await cached_call_ollama(
+            model, user_prompt, system=system_prompt, semantic_text=case["input"],
+            scope_parts=(
+                case["topic_name"], case["question_type"], case["blooms_level"], ",".join(case["co_codes"]),
+            ),
+        )
+        elapsed = time.perf_counter() - start
 
         # Parse the output
         parsed = safe_parse_json(output)
 
-        # Score on 4 criteria
-        s_valid = check_structural_validity(parsed, case.get("question_type", "MCQ"))
-        s_topic = check_topic_relevance(parsed, case.get("topic_name", ""))
-        s_blooms = check_blooms_alignment(parsed, case.get("blooms_level", ""))
-        s_nodup = check_non_duplication(parsed, case.get("all_approved_texts", []))
-
-        score = (s_valid + s_topic + s_blooms + s_nodup) / 4.0
+        # Score on 4 criteria — off the event loop so other cases' I/O keeps flowing
+        scores = await asyncio.to_thread(score_all, parsed, case, approved)
+        score = sum(scores.values()) / 4.0
 
-        results.append({
+        return {
             "input": case["input"],
             "output": output[:500],  # Truncate for storage
             "parsed": parsed is not None,
-            "scores": {
-                "structural_validity": s_valid,
-                "topic_relevance": s_topic,
-                "blooms_alignment": s_blooms,
-                "non_duplication": s_nodup,
-            },
+            "scores": scores,
             "score": score,
             "time_seconds": elapsed
-        })
+        }
+
+    partial = False
+    bound = None
+    if early_stop_threshold is None:
+        # Cases are independent — run them concurrently; ollama_limiter bounds the fan-out
+        results = await asyncio.gather(*[_run_one(c, f) for c, f in zip(test_cases, case_features)])
+    else:
+        # Sequential so we can stop once the outcome vs the threshold is settled
+        results = []
+        n_cases = len(test_cases)
+        score_sum = 0.0
+        for case, feats in zip(test_cases, case_features):
+            r = await _run_one(case, feats)
+            results.append(r)
+            score_sum += r["score"]
+            remaining = n_cases - len(results)
+            lower = score_sum / n_cases
+            upper = (score_sum + remaining) / n_cases
+            if remaining and (lower >= early_stop_threshold or upper < early_stop_threshold):
+                partial = True
+                bound = lower if lower >= early_stop_threshold else upper
+                break
 
     total = len(results)
     avg_score = sum(r["score"] for r in results) / total if total > 0 else 0.0
+    if partial:
+        avg_score = bound
 
     return {
         "total": total,
         "passed": sum(1 for r in results if r["score"] >= 0.5),
         "failed": sum(1 for r in results if r["score"] < 0.5),
         "success_rate": avg_score,
+        "partial": partial,
         "results": results
     }
 
@@ -413,6 +945,7 @@ Do NOT wrap in markdown. RAW JSON only."""
 
 async def run_training_pipeline(subject_id: int, skill_id: int):
     db = SessionLocal()
+    log = LogBuffer(db, skill_id)
     try:
         skill = db.query(Skill).get(skill_id)
         subject = db.query(Subject).get(subject_id)
@@ -420,46 +953,42 @@ async def run_training_pipeline(subject_id: int, skill_id: int):
         # ═══ Phase 1: Preparation ═══
         skill.training_status = "generating"
         skill.training_progress = 0
-        append_log(db, skill_id, "Starting training pipeline...")
+        log.append("Starting training pipeline...")
+        log.flush()
 
         # Check Ollama
         status = await check_ollama()
         if not status["available"]:
             raise Exception("Ollama is not running")
 
+        # Expired cache rows are ignored by lookups; prune them once per run, not per store
+        await asyncio.to_thread(purge_expired_llm_cache)
+
         available_models = status["models"]
         model = "phi3.5"
         actual_model = await resolve_model(model, available_models)
-        append_log(db, skill_id, f"Using model: {actual_model}")
+        log.append(f"Using model: {actual_model}")
+
+        # Load the subject's vetted questions, COs and materials once
+        corpus = load_subject_corpus(db, subject_id)
 
         # Build Test Cases
-        test_cases = build_test_cases(db, subject_id)
+        test_cases = build_test_cases(corpus)
+        # Format the SKILL.md prompt inputs alongside the test cases
+        approved_examples = format_approved_examples(corpus)
+        rejected_examples = format_rejected_examples(corpus)
+        co_context = format_co_context(corpus)
+        study_summary = format_study_summary(corpus)
         if len(test_cases) < 3:
-            append_log(db, skill_id, "WARNING: Few test cases. Training may be weak.")
+            log.append("WARNING: Few test cases. Training may be weak.")
 
         skill.test_cases_json = json.dumps(test_cases, default=str)
         skill.total_test_cases = len(test_cases)
         skill.training_progress = 10
-        db.commit()
 
         # ═══ Phase 2: Generate Skill Document ═══
-        append_log(db, skill_id, "Generating skill document (≤600 words)...")
-
-        approved_examples = format_approved_examples(db, subject_id, max_examples=5)
-        rejected_examples = format_rejected_examples(db, subject_id, max_examples=3)
-        co_context = format_co_context(db, subject_id)
-
-        # Study summary: 2-3 sentences only
-        materials = db.query(StudyMaterial).filter(
-            StudyMaterial.subject_id == subject_id
-        ).limit(3).all()
-        summaries = []
-        for m in materials:
-            if m.content_text:
-                # Take first 200 chars as a brief summary
-                brief = m.content_text[:200].replace("\n", " ").strip()
-                summaries.append(brief)
-        study_summary = " ".join(summaries)[:400] if summaries else "No study materials available."
+        log.append("Generating skill document (≤600 words)...")
+        log.flush()
 
         skill_content, gen_time = await generate_skill_content(
             subject.name, subject.code,
@@ -471,44 +1000,77 @@ async def run_training_pipeline(subject_id: int, skill_id: int):
         skill.skill_content = skill_content
         skill.generated_by_model = actual_model
         word_count = len(skill_content.split())
-        append_log(db, skill_id, f"Skill generated in {gen_time:.1f}s ({word_count} words)")
+        log.append(f"Skill generated in {gen_time:.1f}s ({word_count} words)")
         skill.training_progress = 30
-        db.commit()
-
-        # ═══ Phase 3: Baseline Evaluation ═══
-        skill.training_status = "evaluating_baseline"
-        append_log(db, skill_id, "Running baseline evaluation (WITHOUT skill)...")
-        db.commit()
-
-        baseline_res = await evaluate_with_skill(
-            "", test_cases, subject_id, actual_model, available_models, use_skill=False
-        )
-        skill.baseline_score = baseline_res["success_rate"]
-        append_log(db, skill_id, f"Baseline Score: {skill.baseline_score*100:.0f}%")
-
-        skill.training_progress = 50
-        db.commit()
 
-        # ═══ Phase 4: Skill Evaluation ═══
-        skill.training_status = "evaluating_skill"
-        append_log(db, skill_id, "Running skill evaluation (WITH skill)...")
-        db.commit()
-
-        skill_res = await evaluate_with_skill(
-            skill_content, test_cases, subject_id, actual_model, available_models, use_skill=True
+        # ═══ Phase 3+4: Baseline & Skill Evaluation (concurrent) ═══
+        skill.training_status = "evaluating"
+        log.append("Running baseline (WITHOUT skill) and skill (WITH skill) evaluations...")
+        log.flush()
+
+        # Only retrains have a threshold known up front (the previous version's score)
+        early_stop_threshold = None
+        if SKILL_EVAL_EARLY_STOP and skill.version > 1:
+            early_stop_threshold = skill.previous_trained_score or 0.0
+
+        # The baseline doesn't depend on the skill — reuse it while model and test cases are unchanged
+        tc_hash = hash_test_cases(test_cases)
+        # (subject_id, model, tc_hash) is unique, so this is at most one row
+        baseline_row = db.query(BaselineCache).filter(
+            BaselineCache.subject_id == subject_id,
+            BaselineCache.model == actual_model,
+            BaselineCache.tc_hash == tc_hash,
+        ).first()
+        cached_baseline = None
+        if baseline_row and baseline_row.created_at >= datetime.utcnow() - BASELINE_CACHE_MAX_AGE:
+            cached_baseline = baseline_row
+
+        skill_eval = evaluate_with_skill(
+            skill_content, test_cases, subject_id, actual_model, available_models, use_skill=True,
+            early_stop_threshold=early_stop_threshold,
         )
+        if cached_baseline:
+            skill_res = await skill_eval
+            skill.baseline_score = cached_baseline.score
+            log.append(f"Baseline Score: {skill.baseline_score*100:.0f}% (reused, test cases unchanged)")
+        else:
+            # Both passes only read the materialized test_cases, so they can overlap
+            baseline_res, skill_res = await asyncio.gather(
+                evaluate_with_skill(
+                    "", test_cases, subject_id, actual_model, available_models, use_skill=False
+                ),
+                skill_eval,
+            )
+            skill.baseline_score = baseline_res["success_rate"]
+            # A run with failed calls would pin a bogus baseline; only cache real outputs
+            if baseline_res["results"] and all(
+                r["output"] and not r["output"].startswith("[ERROR]") for r in baseline_res["results"]
+            ):
+                if baseline_row:
+                    baseline_row.score = skill.baseline_score
+                    baseline_row.created_at = datetime.utcnow()
+                else:
+                    db.add(BaselineCache(
+                        subject_id=subject_id, model=actual_model,
+                        tc_hash=tc_hash, score=skill.baseline_score,
+                    ))
+            log.append(f"Baseline Score: {skill.baseline_score*100:.0f}%")
         skill.trained_score = skill_res["success_rate"]
+        skill.trained_score_partial = skill_res["partial"]
 
         if skill.baseline_score > 0:
             skill.improvement_pct = (skill.trained_score - skill.baseline_score) * 100
         else:
             skill.improvement_pct = skill.trained_score * 100
 
-        append_log(db, skill_id, f"Trained Score: {skill.trained_score*100:.0f}%")
-        append_log(db, skill_id, f"Improvement: {skill.improvement_pct:+.1f}%")
+        log.append(f"Trained Score: {skill.trained_score*100:.0f}%")
+        if skill_res["partial"]:
+            log.append(f"Skill evaluation stopped early after {skill_res['total']}/{len(test_cases)} cases; "
+                       f"trained score is the {'lower' if skill.trained_score >= early_stop_threshold else 'upper'} bound")
+        log.append(f"Improvement: {skill.improvement_pct:+.1f}%")
 
         skill.training_progress = 80
-        db.commit()
+        log.flush()
 
         # ═══ Phase 5: Version Rollback Check (Change 3) ═══
         prev_score = skill.previous_trained_score or 0.0
@@ -520,22 +1082,21 @@ async def run_training_pipeline(subject_id: int, skill_id: int):
                 skill.is_active = True
                 skill.auto_deactivated = False
                 skill.deactivation_reason = None
-                append_log(db, skill_id, "✅ First version trained successfully. Skill activated.")
+                log.append("✅ First version trained successfully. Skill activated.")
             else:
                 skill.is_active = False
                 skill.auto_deactivated = True
                 reason = (f"Initial training did not improve over baseline "
                           f"({skill.trained_score*100:.0f}% vs {skill.baseline_score*100:.0f}% baseline).")
                 skill.deactivation_reason = reason
-                append_log(db, skill_id, f"⚠️ {reason} Skill stored but NOT activated.")
+                log.append(f"⚠️ {reason} Skill stored but NOT activated.")
         else:
             # Subsequent versions: compare against previous version's score
             if skill.trained_score >= prev_score:
                 skill.is_active = True
                 skill.auto_deactivated = False
                 skill.deactivation_reason = None
-                append_log(db, skill_id,
-                    f"✅ V{skill.version} scores {skill.trained_score*100:.0f}% ≥ previous {prev_score*100:.0f}%. Activated.")
+                log.append(f"✅ V{skill.version} scores {skill.trained_score*100:.0f}% ≥ previous {prev_score*100:.0f}%. Activated.")
             else:
                 skill.is_active = False
                 skill.auto_deactivated = True
@@ -543,11 +1104,11 @@ async def run_training_pipeline(subject_id: int, skill_id: int):
                           f"({skill.trained_score*100:.0f}% vs {prev_score*100:.0f}%). "
                           f"Previous version remains active. Consider adding more diverse vetted examples.")
                 skill.deactivation_reason = reason
-                append_log(db, skill_id, f"⚠️ {reason}")
+                log.append(f"⚠️ {reason}")
 
         skill.training_status = "complete"
         skill.training_progress = 100
-        db.commit()
+        log.flush()
 
     except Exception as e:
         print(f"Training failed: {e}")
@@ -555,7 +1116,7 @@ async def run_training_pipeline(subject_id: int, skill_id: int):
         if skill:
             skill.training_status = "failed"
             skill.error_message = str(e)
-            append_log(db, skill_id, f"❌ Failed: {str(e)}")
-            db.commit()
+            log.append(f"❌ Failed: {str(e)}")
+            log.flush()
     finally:
         db.close()
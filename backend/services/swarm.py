@@ -1,33 +1,50 @@
-import httpx
+import os
+import aiohttp
 import json
 import time
 import re
 import hashlib
 import asyncio
-from difflib import SequenceMatcher
+import weakref
+import functools
+import logging
+import random
+import threading
+from collections import Counter, OrderedDict, deque
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 OLLAMA_BASE = "http://127.0.0.1:11434"
 
+logger = logging.getLogger(__name__)
+
 AGENTS = {
     "logician": {
         "model": "phi4-mini:latest",
         "role": "Strict adherence to facts from the study material. Generate questions grounded in source content.",
         "temperature": 0.5,  # Lower = more precise/factual
+        "num_predict": 1024,
     },
     "creative": {
         "model": "llama3.2:3b-instruct-q4_K_M",
         "role": "Review questions for accuracy, clarity, and suggest improvements while staying true to source material.",
         "temperature": 0.7,
+        "num_predict": 512,  # Review JSON is short
     },
     "technician": {
         "model": "qwen2.5:3b-instruct-q4_K_M",
         "role": "Generate precise, well-structured questions with proper formatting and technical accuracy.",
         "temperature": 0.5,  # Lower = more precise
+        "num_predict": 1024,
     },
     "chairman": {
         "model": "phi4-mini:latest",
         "role": "Final arbiter. Score drafts, select the best, assign confidence score based on factual accuracy.",
-        "temperature": 0.4,  # Lowest = most deterministic selection
+        "temperature": 0.2,  # Lowest = most deterministic selection
+        "num_predict": 768,  # Selection + OBE justification
     },
 }
 
@@ -39,6 +56,9 @@ MIN_USED_CHUNKS_BY_BLOOM = {
     "knowledge": 1, "comprehension": 1, "application": 2,
     "analysis": 2, "synthesis": 2, "evaluation": 2,
 }
+# Share of a supporting quote's words that must appear in its cited chunk when
+# the quote is not a verbatim substring
+QUOTE_MIN_WORD_OVERLAP = 0.8
 DIRECTNESS_PREFIX_BLACKLIST = [
     "what is", "define", "state the", "list the", "name the",
     "mention the", "what are", "give the definition",
@@ -46,30 +66,112 @@ DIRECTNESS_PREFIX_BLACKLIST = [
 FORBIDDEN_SCENARIO_PATTERNS = [
     r"\ba clinician\b", r"\ba patient named\b", r"\bdr\.\s+\w+\b",
 ]
-DEDUP_SIMILARITY_THRESHOLD = 0.95
+# One compiled matcher each, instead of a startswith()/re call per entry
+_DIRECTNESS_RE = re.compile(r"^(?:" + "|".join(re.escape(p) for p in DIRECTNESS_PREFIX_BLACKLIST) + r")\b")
+_FORBIDDEN_SCENARIO_RE = re.compile("|".join(FORBIDDEN_SCENARIO_PATTERNS), re.IGNORECASE)
+# Jaccard similarity of 5-char shingle sets at which a question counts as a repeat.
+# Roughly a one-phrase rewrite of a ~150-char question; scattered edits drop it fast.
+DEDUP_SHINGLE_SIZE = 5
+DEDUP_JACCARD_THRESHOLD = 0.8
+# Task-level budgets (seconds) per council call; a stuck socket can otherwise
+# outlive the socket read timeout, which only bounds the gap between bytes
+TIMEOUTS = {"agent_a": 90, "agent_b": 45, "agent_c": 90, "chairman": 60}
+# Agent B review score at which A's draft skips Agent C and the Chairman
+FAST_PATH_MIN_REVIEW_SCORE = float(os.getenv("SWARM_FAST_PATH_SCORE", "9"))
+# Gap between B's scores for A and C at which the better draft wins without the Chairman
+HEURISTIC_MIN_SCORE_GAP = float(os.getenv("SWARM_HEURISTIC_SCORE_GAP", "2"))
+# Adaptive output budgets: once enough replies of a (step, question type) have been
+# seen, num_predict becomes headroom * p95 of their length, clamped to
+# [floor, AGENTS cap]. Lengths are estimated at ~3 chars per token, which errs high
+# for JSON.
+NUM_PREDICT_MIN_SAMPLES = 20
+NUM_PREDICT_HEADROOM = 1.2
+NUM_PREDICT_FLOOR = 300
+_len_stats: dict[tuple[str, str], deque] = {}
 
 # Session-level dedup state (reset per generation job)
 _session_questions: list[str] = []
+_session_shingles: list[frozenset] = []
+# Union of every shingle seen this session; an exact stand-in for a Bloom filter
+_session_shingle_union: set[str] = set()
+
+
+# ─── Core Ollama Interface ───
+
+# Request bodies carry multi-KB prompts and every agent reply is parsed at least
+# once; orjson does both several times faster than stdlib json when installed.
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+# No overall cap (the council's TIMEOUTS handle that); 300s max between bytes
+OLLAMA_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5, sock_read=300)
+# How long Ollama keeps a model (and its prompt KV cache) resident after a request
+OLLAMA_MODEL_KEEP_ALIVE = os.getenv("OLLAMA_MODEL_KEEP_ALIVE", "30m")
+# Pool sized for peak fan-out (4 agents x parallel questions); override per deployment
+OLLAMA_MAX_CONN = int(os.getenv("OLLAMA_MAX_CONN", "64"))
+OLLAMA_KEEPALIVE = float(os.getenv("OLLAMA_KEEPALIVE", "30"))
+
+# One pooled session per event loop — generation jobs run asyncio.run() in worker
+# threads, and an aiohttp session must not be shared across loops.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> aiohttp.ClientSession:
+    """Shared keep-alive Ollama session for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.closed:
+        connector = aiohttp.TCPConnector(
+            limit=OLLAMA_MAX_CONN, limit_per_host=OLLAMA_MAX_CONN,
+            keepalive_timeout=OLLAMA_KEEPALIVE, ttl_dns_cache=300,
+        )
+        client = aiohttp.ClientSession(base_url=OLLAMA_BASE, connector=connector, timeout=OLLAMA_TIMEOUT)
+        _clients[loop] = client
+    return client
+
+
+async def aclose_client():
+    """Close the running loop's shared session (app shutdown / end of a worker job)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
 
 
-# ─── Core Ollama Interface (unchanged) ───
+# /api/tags only changes when models are pulled/removed — probe at most once a minute
+_TAGS_TTL = 60.0
+_TAGS_CACHE = {"ts": 0.0, "data": None}
+
 
 async def check_ollama() -> dict:
-    """Check if Ollama is available and list loaded models."""
+    """Check if Ollama is available and list loaded models (cached for _TAGS_TTL)."""
+    if _TAGS_CACHE["data"] and time.monotonic() - _TAGS_CACHE["ts"] < _TAGS_TTL:
+        return _TAGS_CACHE["data"]
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(f"{OLLAMA_BASE}/api/tags")
-            if resp.status_code == 200:
-                data = resp.json()
-                models = [m["name"] for m in data.get("models", [])]
-                return {"available": True, "models": models}
+        async with get_client().get("/api/tags", timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            body = await resp.read() if resp.status == 200 else None
+        if body is not None:
+            data = _loads(body)
+            models = [m["name"] for m in data.get("models", [])]
+            status = {"available": True, "models": models}
+            _TAGS_CACHE.update(ts=time.monotonic(), data=status)
+            return status
     except Exception:
         pass
+    # Outages are never cached, so a restarted server is picked up immediately
+    _TAGS_CACHE.update(ts=0.0, data=None)
     return {"available": False, "models": []}
 
 
-async def resolve_model(preferred: str, available: list) -> str:
-    """Resolve the best available model match."""
+@functools.lru_cache(maxsize=64)
+def _resolve_model_sync(preferred: str, available: tuple[str, ...]) -> str:
     if preferred in available:
         return preferred
     for m in available:
@@ -80,31 +182,396 @@ async def resolve_model(preferred: str, available: list) -> str:
     return preferred
 
 
-async def call_ollama(model: str, prompt: str, system: str = "", temperature: float = 0.7, num_predict: int = 1024) -> tuple[str, float]:
-    """Call Ollama /api/generate and return (response_text, elapsed_seconds)."""
-    start = time.time()
+async def resolve_model(preferred: str, available: list) -> str:
+    """Resolve the best available model match."""
+    return _resolve_model_sync(preferred, tuple(available))
+
+
+_COUNCIL_ROLES = {"agent_a": "logician", "agent_b": "creative", "agent_c": "technician", "chairman": "chairman"}
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_council_models(available: tuple[str, ...]) -> tuple[tuple[str, str], ...]:
+    return tuple((slot, _resolve_model_sync(AGENTS[role]["model"], available)) for slot, role in _COUNCIL_ROLES.items())
+
+
+def resolve_council_models(available: list) -> dict[str, str]:
+    """Model per council slot (agent_a/agent_b/agent_c/chairman), resolved once per model list."""
+    return dict(_resolve_council_models(tuple(available)))
+
+
+# ─── Response Cache & In-Flight Dedup ───
+# Identical requests (same model, prompt, system and options) recur on batch
+# papers and retries. Complete answers are kept in a small process-wide LRU
+# (replies cut off by num_predict or stop_at are not); concurrent duplicates
+# on the same loop share one in-flight request.
+RESPONSE_CACHE_SIZE = int(os.getenv("OLLAMA_RESPONSE_CACHE_SIZE", "256"))
+_response_lru: "OrderedDict[str, str]" = OrderedDict()
+_response_lru_lock = threading.Lock()
+# Futures are bound to their loop, so the in-flight registry is per loop too
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Future]]" = weakref.WeakKeyDictionary()
+
+
+def _lru_get(key: str) -> str | None:
+    with _response_lru_lock:
+        text = _response_lru.get(key)
+        if text is not None:
+            _response_lru.move_to_end(key)
+        return text
+
+
+def _lru_put(key: str, text: str):
+    with _response_lru_lock:
+        _response_lru[key] = text
+        _response_lru.move_to_end(key)
+        while len(_response_lru) > RESPONSE_CACHE_SIZE:
+            _response_lru.popitem(last=False)
+
+
+# Transient failures (connection errors, 5xx, 429) are retried with jittered
+# exponential backoff, honouring Retry-After, before the call gives up.
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "2"))
+_RETRY_AFTER_CAP = 5.0
+
+
+class OllamaCallError(RuntimeError):
+    """An Ollama request failed for good (after retries, or on a timeout)."""
+
+    def __init__(self, message: str, elapsed: float = 0.0):
+        super().__init__(message)
+        self.elapsed = elapsed
+
+
+def _backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), _RETRY_AFTER_CAP)
+        except ValueError:
+            pass
+    return 0.25 * 2 ** attempt + random.random() * 0.1
+
+
+# How much of a streamed reply is searched for a stop_at match before giving up
+STOP_AT_SCAN_CHARS = 400
+
+
+def _is_complete(chunk: dict) -> bool:
+    """A final Ollama chunk that ended on its own rather than at num_predict."""
+    return bool(chunk.get("done")) and chunk.get("done_reason") != "length"
+
+
+async def _read_json_stream(resp, extract, stop_at: re.Pattern | None = None) -> tuple[str, bool]:
+    """
+    Accumulate a streamed (NDJSON) reply until its top-level JSON value closes.
+    Closing the response at that point stops generation server-side, so padding
+    the model would emit up to num_predict is never decoded. Without a complete
+    value the whole stream is returned.
+    stop_at ends the stream early (partial text returned) when it matches within
+    the first STOP_AT_SCAN_CHARS characters.
+    Returns (text, complete): complete when the JSON value closed or the model
+    finished on its own.
+    """
+    parts = []
+    head = ""
+    complete = False
+    scanner = _BracketScanner()
+    async for line in resp.content:
+        line = line.strip()
+        if not line:
+            continue
+        chunk = _loads(line)
+        piece = extract(chunk)
+        if piece:
+            end = scanner.feed(piece)
+            if end >= 0:
+                parts.append(piece[:end])
+                complete = True
+                resp.close()
+                break
+            parts.append(piece)
+            if stop_at is not None:
+                head += piece
+                if stop_at.search(head):
+                    resp.close()
+                    break
+                if len(head) > STOP_AT_SCAN_CHARS:
+                    stop_at = None
+        if chunk.get("done"):
+            complete = _is_complete(chunk)
+            break
+    return "".join(parts), complete
+
+
+async def _send_ollama(
+    path: str, body: bytes, extract, stream: bool = False, stop_at: re.Pattern | None = None,
+) -> tuple[str, float, bool]:
+    """Send one request with retries; returns (text, elapsed, complete)."""
+    start = time.perf_counter()
+    for attempt in range(OLLAMA_RETRIES + 1):
+        retry_after = None
+        try:
+            async with get_client().post(path, data=body, headers=_JSON_HEADERS) as resp:
+                status = resp.status
+                retry_after = resp.headers.get("Retry-After")
+                if status == 200 and stream:
+                    text, complete = await _read_json_stream(resp, extract, stop_at)
+                    return (text, time.perf_counter() - start, complete)
+                content = await resp.read()
+        except asyncio.TimeoutError as e:
+            # Already waited out the read timeout; retrying would only double it
+            error = f"timeout: {e!r}"
+            break
+        except aiohttp.ClientError as e:
+            error = f"{type(e).__name__}: {e}"
+        except ValueError:
+            error = "invalid JSON in Ollama stream"
+            break
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            break
+        else:
+            if status == 200:
+                try:
+                    data = _loads(content)
+                    return (extract(data), time.perf_counter() - start, _is_complete(data))
+                except ValueError:
+                    error = "invalid JSON in Ollama response"
+                    break
+            error = f"HTTP {status}: {content.decode(errors='replace')}"
+            if status < 500 and status != 429:
+                break
+        if attempt < OLLAMA_RETRIES:
+            await asyncio.sleep(_backoff_delay(attempt, retry_after))
+    raise OllamaCallError(error, time.perf_counter() - start)
+
+
+async def _post_ollama(
+    path: str, payload: dict, extract, raise_errors: bool = False, stop_at: re.Pattern | None = None,
+    cache: bool = True,
+) -> tuple[str, float]:
+    """
+    POST a request, served from the LRU or a duplicate in flight when possible.
+    Streaming payloads are read only up to the end of their JSON value (or a stop_at match).
+    Only complete replies enter the LRU; cache=False (sampled drafts, where a
+    repeat should produce a fresh sample) skips it and keeps in-flight dedup only.
+    Failures come back as an "[ERROR] ..." reply, or as OllamaCallError with raise_errors=True.
+    """
+    body = _dumps(payload)
+    # stop_at is part of the key: a cut-short reply must not answer a full request
+    key_src = path.encode() + b"\0" + body
+    if stop_at is not None:
+        key_src += b"\0" + stop_at.pattern.encode()
+    key = hashlib.sha256(key_src).hexdigest()
+
+    cached = _lru_get(key) if cache else None
+    if cached is not None:
+        return (cached, 0.0)
+
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
     try:
+        pending = inflight.get(key)
+        if pending is not None:
+            # shield: a cancelled waiter must not cancel the request it is sharing
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        inflight[key] = fut
+        try:
+            text, elapsed, complete = await _send_ollama(
+                path, body, extract, stream=payload.get("stream", False), stop_at=stop_at,
+            )
+        except OllamaCallError as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved; waiters still receive it
+            raise
+        except BaseException:
+            fut.set_exception(OllamaCallError("cancelled"))
+            fut.exception()
+            raise
+        finally:
+            inflight.pop(key, None)
+        result = (text, elapsed)
+        fut.set_result(result)
+        if cache and complete:
+            _lru_put(key, text)
+        return result
+    except OllamaCallError as e:
+        if raise_errors:
+            raise
+        return (f"[ERROR] {e}", e.elapsed)
+
+
+async def call_ollama(
+    model: str, prompt: str, system: str = "", temperature: float = 0.7, num_predict: int = 1024,
+    raise_errors: bool = False,
+) -> tuple[str, float]:
+    """Call Ollama /api/generate and return (response_text, elapsed_seconds)."""
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": OLLAMA_MODEL_KEEP_ALIVE,
+        "options": {"temperature": temperature, "num_predict": num_predict},
+    }
+    if system:
+        payload["system"] = system
+    return await _post_ollama("/api/generate", payload, lambda data: data.get("response", ""), raise_errors)
+
+
+async def prewarm_models(models=None) -> list[str]:
+    """
+    Load the council models into Ollama ahead of the first request.
+    Sends a one-token generate per distinct model with keep_alive so the
+    multi-second load from disk happens at server boot instead of inside a
+    user's first generation. Returns the models that answered.
+    """
+    if models is None:
+        status = await check_ollama()
+        if not status["available"]:
+            return []
+        models = list(resolve_council_models(status["models"]).values())
+
+    async def _ping(model: str) -> bool:
         payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": temperature, "num_predict": num_predict},
+            "model": model, "prompt": "ok", "stream": False,
+            "keep_alive": OLLAMA_MODEL_KEEP_ALIVE, "options": {"num_predict": 1},
         }
-        if system:
-            payload["system"] = system
+        try:
+            async with get_client().post("/api/generate", data=_dumps(payload), headers=_JSON_HEADERS) as resp:
+                await resp.read()
+                return resp.status == 200
+        except Exception:
+            return False
+
+    models = sorted(set(models))
+    ok = await asyncio.gather(*(_ping(m) for m in models))
+    warmed = [m for m, good in zip(models, ok) if good]
+    logger.info("Pre-warmed models: %s", warmed)
+    return warmed
+
+
+def _chat_payload(model: str, messages: list[dict], temperature: float, num_predict: int, fmt: str | None, stream: bool) -> dict:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": OLLAMA_MODEL_KEEP_ALIVE,
+        "options": {"temperature": temperature, "num_predict": num_predict},
+    }
+    if fmt:
+        payload["format"] = fmt
+    return payload
+
+
+async def call_ollama_chat(
+    model: str, messages: list[dict], temperature: float = 0.7, num_predict: int = 1024, fmt: str | None = None,
+    raise_errors: bool = False, stop_at: re.Pattern | None = None, cache: bool = True,
+) -> tuple[str, float]:
+    """Call Ollama /api/chat and return (assistant_text, elapsed_seconds).
+
+    Keeping the large, unchanging context in the leading system message lets
+    Ollama reuse its prompt cache across agents and attempts instead of
+    re-prefilling the same study material on every call. fmt="json" turns on
+    Ollama's grammar-constrained JSON output; those replies are streamed and
+    cut off as soon as the JSON value is complete, or earlier once stop_at
+    matches near the start of the reply. cache=False skips the response LRU.
+    """
+    payload = _chat_payload(model, messages, temperature, num_predict, fmt, stream=fmt == "json")
+    return await _post_ollama(
+        "/api/chat", payload, lambda data: (data.get("message") or {}).get("content", ""), raise_errors,
+        stop_at=stop_at, cache=cache,
+    )
 
-        async with httpx.AsyncClient(timeout=180) as client:
-            resp = await client.post(f"{OLLAMA_BASE}/api/generate", json=payload)
 
-            elapsed = time.time() - start
-            if resp.status_code == 200:
-                data = resp.json()
-                return (data.get("response", ""), elapsed)
-            else:
-                return (f"[ERROR] HTTP {resp.status_code}: {resp.text}", elapsed)
-    except Exception as e:
-        elapsed = time.time() - start
-        return (f"[ERROR] {str(e)}", elapsed)
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.DOTALL)
+
+
+class _BracketScanner:
+    """
+    Incremental, string-aware bracket matcher. Text before the first open_c is
+    skipped; feed() returns the offset just past the matching close_c, or -1.
+    Without brackets given, whichever of '{' / '[' appears first is tracked.
+    """
+
+    def __init__(self, open_c: str | None = None, close_c: str | None = None):
+        self.open_c, self.close_c = open_c, close_c
+        self.depth, self.in_str, self.esc = 0, False, False
+
+    def feed(self, text: str) -> int:
+        open_c, close_c = self.open_c, self.close_c
+        depth, in_str, esc = self.depth, self.in_str, self.esc
+        for i, c in enumerate(text):
+            if in_str:
+                if esc:
+                    esc = False
+                elif c == "\\":
+                    esc = True
+                elif c == '"':
+                    in_str = False
+                continue
+            if depth == 0 and c != open_c:
+                if open_c is not None or c not in "{[":
+                    continue
+                open_c, close_c = c, "}" if c == "{" else "]"
+                self.open_c, self.close_c = open_c, close_c
+            if c == '"':
+                in_str = True
+            elif c == open_c:
+                depth += 1
+            elif c == close_c:
+                depth -= 1
+                if depth == 0:
+                    self.depth, self.in_str, self.esc = 0, False, False
+                    return i + 1
+        self.depth, self.in_str, self.esc = depth, in_str, esc
+        return -1
+
+
+def _find_balanced(text: str, open_c: str, close_c: str) -> str | None:
+    """Return the first balanced open_c...close_c span, ignoring brackets inside JSON strings."""
+    start = text.find(open_c)
+    if start < 0:
+        return None
+    end = _BracketScanner(open_c, close_c).feed(text[start:])
+    return text[start : start + end] if end >= 0 else None
+
+
+def _try_autoclose(text: str) -> str | None:
+    """
+    Close a JSON value cut off at EOF (typically num_predict running out) by
+    terminating an open string and appending the missing '}' / ']' in order.
+    Returns None when nothing is left open.
+    """
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    stack, in_str, esc = [], False, False
+    for c in text[start:]:
+        if in_str:
+            if esc:
+                esc = False
+            elif c == "\\":
+                esc = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c == "{":
+            stack.append("}")
+        elif c == "[":
+            stack.append("]")
+        elif c in "}]" and stack:
+            stack.pop()
+    if not stack:
+        return None
+    closed = text[start:]
+    if in_str:
+        closed = (closed[:-1] if esc else closed) + '"'
+    closed = closed.rstrip().rstrip(",")
+    if closed.endswith(":"):
+        closed += " null"
+    return closed + "".join(reversed(stack))
 
 
 def parse_json(text: str):
@@ -112,69 +579,101 @@ def parse_json(text: str):
     if not text:
         return None
     
-    # Strip trailing commas that often break strict python json.loads
-    text = re.sub(r',\s*([}\]])', r'\1', text)
+    # Strip trailing commas that often break strict JSON parsers
+    text = _TRAILING_COMMA_RE.sub(r'\1', text)
+    # orjson.JSONDecodeError and json.JSONDecodeError both subclass ValueError
     try:
-        return json.loads(text.strip())
-    except json.JSONDecodeError:
+        return _loads(text.strip())
+    except ValueError:
         pass
 
-    for start_char, end_char in [("{", "}"), ("[", "]")]:
-        start_idx = text.find(start_char)
-        if start_idx == -1:
+    fenced = _JSON_FENCE_RE.search(text)
+    if fenced:
+        try:
+            return _loads(fenced.group(1))
+        except ValueError:
+            pass
+
+    # Try whichever structure opens first; the other only if that one fails
+    obj_at, arr_at = text.find("{"), text.find("[")
+    pairs = [("{", "}", obj_at), ("[", "]", arr_at)]
+    pairs = sorted((p for p in pairs if p[2] >= 0), key=lambda p: p[2])
+    for start_char, end_char, _ in pairs:
+        span = _find_balanced(text, start_char, end_char)
+        if span is None:
+            continue
+        try:
+            return _loads(span)
+        except ValueError:
             continue
-        depth = 0
-        for i in range(start_idx, len(text)):
-            if text[i] == start_char:
-                depth += 1
-            elif text[i] == end_char:
-                depth -= 1
-            if depth == 0:
-                try:
-                    return json.loads(text[start_idx : i + 1])
-                except json.JSONDecodeError:
-                    break
     return None
 
 
+# Section 2 (CO-Bloom reference) starts the extract; section 5 (gold examples) ends it
+_SECTION_START_RE = re.compile(r"^[ \t]*##\s*2\b|co[- ]bloom|co to bloom|co reference", re.I | re.M)
+_SECTION_STOP_RE = re.compile(r"^[ \t]*##\s*5\b|gold example", re.I | re.M)
+
+
+@functools.lru_cache(maxsize=16)
 def extract_skill_sections(skill_content: str) -> str:
     """Extract only Sections 2-4 from a SKILL.md document for prompt injection."""
     if not skill_content:
         return ""
-    
-    lines = skill_content.split("\n")
-    include = False
-    result = []
-    
-    for line in lines:
-        stripped = line.strip().lower()
-        if "## 2" in stripped or "co-bloom" in stripped or "co to bloom" in stripped or "co reference" in stripped:
-            include = True
-        if "## 5" in stripped or "gold example" in stripped:
-            include = False
-            break
-        if include:
-            result.append(line)
-    
-    extracted = "\n".join(result).strip()
+
+    m_start = _SECTION_START_RE.search(skill_content)
+    if not m_start:
+        return skill_content[:1500]
+    # Expand both matches to whole lines, as the line-based scan used to
+    start = skill_content.rfind("\n", 0, m_start.start()) + 1
+    m_stop = _SECTION_STOP_RE.search(skill_content, m_start.end())
+    end = skill_content.rfind("\n", 0, m_stop.start()) if m_stop else len(skill_content)
+
+    extracted = skill_content[start:end].strip()
     if len(extracted) < 50:
         return skill_content[:1500]
     return extracted
 
 
+@functools.lru_cache(maxsize=32)
+def _syllabus_context_cached(los: tuple, cos: tuple, blooms: tuple) -> str:
+    los_text = "\n".join([f"- {acc}: {desc}" for acc, desc in los]) if los else "[No LOs mapped for this unit]"
+    cos_text = "\n".join([f"- {acc}: {desc}" for acc, desc in cos]) if cos else "[No COs mapped for this unit]"
+    blooms_text = "\n".join([f"- {level}: {weight}%" for level, weight in blooms]) if blooms else "[No Bloom data]"
+    return f"SYLLABUS MAPPING:\nLearning Outcomes: {los_text}\nCourse Outcomes: {cos_text}\nBloom's: {blooms_text}\n"
+
+
+def build_syllabus_context(syllabus_data: dict) -> str:
+    """SYLLABUS MAPPING block for the agent prompts (memoised per distinct mapping)."""
+    if not syllabus_data:
+        return "No specific syllabus mapping provided."
+    return _syllabus_context_cached(
+        tuple((syllabus_data.get("los") or {}).items()),
+        tuple((syllabus_data.get("cos") or {}).items()),
+        tuple((syllabus_data.get("bloom_distribution") or {}).items()),
+    )
+
+
 # ─── (2) RAG Context Formatting: Labeled Chunks ───
 
-def format_rag_as_labeled_chunks(rag_context: str) -> tuple[str, dict[str, str]]:
+_NO_MATERIAL = "No study material context available."
+
+
+def format_rag_as_labeled_chunks(
+    rag_context: str = "", raw_chunks: list[str] | None = None,
+) -> tuple[str, dict[str, str]]:
     """
     Convert raw RAG context into labeled chunks [C1], [C2], ...
+    Pass raw_chunks (already split and stripped) to skip re-splitting rag_context.
     Returns: (formatted_string, chunk_map: {chunk_id: chunk_text})
     """
-    if not rag_context or rag_context.strip() == "No study material context available.":
-        return rag_context, {}
+    if raw_chunks is None:
+        if not rag_context or rag_context.strip() == _NO_MATERIAL:
+            return rag_context, {}
+        # Split by double newline (chunks were joined this way in generation.py)
+        raw_chunks = [c.strip() for c in rag_context.split("\n\n") if c.strip()]
+    elif raw_chunks == [_NO_MATERIAL]:
+        return _NO_MATERIAL, {}
 
-    # Split by double newline (chunks were joined this way in generation.py)
-    raw_chunks = [c.strip() for c in rag_context.split("\n\n") if c.strip()]
-    
     if not raw_chunks:
         return rag_context, {}
 
@@ -219,9 +718,18 @@ def resolve_bloom(bloom_level: str = "", syllabus_data: dict = None, difficulty:
     return defaults.get(difficulty.lower(), "apply")
 
 
+_HIGHER_ORDER_BLOOMS = frozenset({"apply", "analyze", "evaluate", "create"})
+_MEDIUM_HARD = frozenset({"medium", "hard"})
+
+
 def is_higher_order_bloom(bloom: str) -> bool:
     """Check if bloom level requires multi-step reasoning."""
-    return bloom in ("apply", "analyze", "evaluate", "create")
+    return bloom in _HIGHER_ORDER_BLOOMS
+
+
+def needs_multi_step(bloom: str, difficulty: str) -> bool:
+    """Higher-order Bloom or medium/hard difficulty: enforce citation count and indirectness."""
+    return bloom in _HIGHER_ORDER_BLOOMS or difficulty.lower() in _MEDIUM_HARD
 
 
 # ─── (3A) Bloom-Aware Verb Bank ───
@@ -238,17 +746,40 @@ BLOOM_VERB_BANK = {
 
 # ─── (3C) Validation Gate ───
 
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=64)
+def _chunk_words(chunk_lower: str) -> frozenset:
+    return frozenset(_WORD_RE.findall(chunk_lower))
+
+
+def _quote_overlap(quote_lower: str, chunk_lower: str) -> float:
+    """Fraction of the quote's distinct words (3+ chars) that occur in the chunk."""
+    words = {w for w in _WORD_RE.findall(quote_lower) if len(w) > 2}
+    if not words:
+        return 0.0
+    return len(words & _chunk_words(chunk_lower)) / len(words)
+
+
 def validate_question_output(
     parsed: dict,
     question_type: str,
     bloom: str,
     difficulty: str,
     chunk_map: dict,
+    chunk_map_lower: dict | None = None,
+    multi_step: bool | None = None,
 ) -> list[str]:
     """
     Validate a generated question JSON against grounding and standardness rules.
     Returns list of error strings (empty = valid).
+    chunk_map_lower (chunk_map with lowercased text) and multi_step
+    (needs_multi_step(bloom, difficulty)) can be passed in by callers that
+    validate several times for the same question.
     """
+    if multi_step is None:
+        multi_step = needs_multi_step(bloom, difficulty)
     errors = []
     if not parsed or not isinstance(parsed, dict):
         errors.append("Output is not a valid JSON object")
@@ -272,28 +803,39 @@ def validate_question_output(
     # Citation check
     used_chunks = parsed.get("used_chunks", [])
     min_chunks = MIN_USED_CHUNKS_BY_BLOOM.get(bloom, 1)
-    if is_higher_order_bloom(bloom) or difficulty.lower() in ("medium", "hard"):
+    if multi_step:
         if len(used_chunks) < min_chunks:
             errors.append(f"Bloom '{bloom}' requires >={min_chunks} used_chunks, got {len(used_chunks)}")
 
     # Quote validity (lightweight)
     quotes = parsed.get("supporting_quotes", [])
     if chunk_map and quotes:
+        if chunk_map_lower is None:
+            chunk_map_lower = {k: v.lower() for k, v in chunk_map.items()}
         for sq in quotes[:3]:  # Check first 3 only for speed
             cid = sq.get("chunk_id", "")
             quote = sq.get("quote", "")
-            if cid in chunk_map and quote:
+            if cid in chunk_map_lower and quote:
                 # Check if quote appears as substring (case-insensitive, fuzzy)
-                if quote.lower()[:50] not in chunk_map[cid].lower():
+                quote_lower = quote.lower()
+                if quote_lower[:50] in chunk_map_lower[cid]:
+                    continue
+                # Paraphrased or lightly edited quotes still count if most of
+                # their words come from the cited chunk
+                if _quote_overlap(quote_lower, chunk_map_lower[cid]) < QUOTE_MIN_WORD_OVERLAP:
                     errors.append(f"Quote from {cid} not found in chunk text")
 
     # Directness check (Bloom-aware)
-    if qt and (is_higher_order_bloom(bloom) or difficulty.lower() in ("medium", "hard")):
-        qt_lower = qt.lower().strip()
-        for prefix in DIRECTNESS_PREFIX_BLACKLIST:
-            if qt_lower.startswith(prefix):
-                errors.append(f"Question starts with '{prefix}' — too direct for Bloom '{bloom}'")
-                break
+    if qt and multi_step:
+        direct = _DIRECTNESS_RE.match(qt.lower().strip())
+        if direct:
+            errors.append(f"Question starts with '{direct.group(0)}' — too direct for Bloom '{bloom}'")
+
+    # Invented-scenario framing (named patients, doctors, ...)
+    if qt and isinstance(qt, str):
+        scenario = _FORBIDDEN_SCENARIO_RE.search(qt)
+        if scenario:
+            errors.append(f"Question uses a forbidden scenario framing ('{scenario.group(0)}')")
 
     return errors
 
@@ -321,7 +863,7 @@ async def repair_mcq_options(
     if len(opts) == 4:
         return final_question  # Already correct
 
-    print(f"[Swarm] MCQ option repair: got {len(opts)} options, need 4. Attempting LLM fix...")
+    logger.info("MCQ option repair: got %d options, need 4. Attempting LLM fix...", len(opts))
 
     # Build a targeted repair prompt
     q_text = final_question.get("question_text") or final_question.get("question") or ""
@@ -370,13 +912,13 @@ async def repair_mcq_options(
             else:
                 # correct_answer doesn't match any option — use first option as fallback
                 final_question["correct_answer"] = repaired["options"][0]
-            print("[Swarm] MCQ option repair succeeded via LLM.")
+            logger.info("MCQ option repair succeeded via LLM.")
             return final_question
     except Exception as e:
-        print(f"[Swarm] MCQ option LLM repair failed: {e}")
+        logger.warning("MCQ option LLM repair failed: %s", e)
 
     # Fallback: mechanical pad / truncate
-    print("[Swarm] MCQ option repair: falling back to mechanical fix.")
+    logger.info("MCQ option repair: falling back to mechanical fix.")
     if len(opts) > 4:
         # Keep correct_answer + first 3 others
         if correct in opts:
@@ -406,33 +948,63 @@ async def repair_mcq_options(
 
 # ─── (5) Dedup ───
 
+_WS_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=1024)
 def _normalize_text(text: str) -> str:
     """Normalize question text for dedup comparison."""
-    return re.sub(r'\s+', ' ', text.lower().strip())
+    return _WS_RE.sub(' ', text.lower().strip())
+
+
+def _shingles(normalized: str) -> frozenset:
+    k = DEDUP_SHINGLE_SIZE
+    if len(normalized) <= k:
+        return frozenset((normalized,))
+    return frozenset(normalized[i:i + k] for i in range(len(normalized) - k + 1))
 
 
 def is_duplicate(question_text: str) -> bool:
     """Check if question is too similar to any previous question in this session."""
-    normalized = _normalize_text(question_text)
-    for prev in _session_questions:
-        ratio = SequenceMatcher(None, normalized, prev).ratio()
-        if ratio >= DEDUP_SIMILARITY_THRESHOLD:
+    query = _shingles(_normalize_text(question_text))
+    n = len(query)
+    # A match needs |Q ∩ P| >= threshold * |Q ∪ P| >= threshold * |Q|, so a query
+    # with fewer session-wide shingle hits than that cannot match anything
+    if len(query & _session_shingle_union) < DEDUP_JACCARD_THRESHOLD * n:
+        return False
+    for prev in _session_shingles:
+        # Jaccard can never exceed min/max of the set sizes, so pairs whose
+        # sizes differ too much are skipped without intersecting
+        m = len(prev)
+        if min(n, m) < DEDUP_JACCARD_THRESHOLD * max(n, m):
+            continue
+        # Set intersection runs in C and is linear in the shingle count, unlike
+        # the quadratic SequenceMatcher ratio this replaces
+        inter = len(query & prev)
+        if inter and inter / (n + m - inter) >= DEDUP_JACCARD_THRESHOLD:
             return True
     return False
 
 
 def register_in_session(question_text: str):
     """Register a question in the session dedup list."""
-    _session_questions.append(_normalize_text(question_text))
+    normalized = _normalize_text(question_text)
+    _session_questions.append(normalized)
+    shingles = _shingles(normalized)
+    _session_shingles.append(shingles)
+    _session_shingle_union.update(shingles)
 
 
 def clear_session():
     """Clear session dedup state (call at start of each generation job)."""
     _session_questions.clear()
+    _session_shingles.clear()
+    _session_shingle_union.clear()
 
 
 # ─── Format Instructions (per question type, with citation fields) ───
 
+@functools.lru_cache(maxsize=32)
 def get_format_instruction(question_type: str, bloom: str) -> str:
     """Build format instruction JSON schema with citation fields."""
     citation_fields = '"used_chunks": ["C1", "C3"], "supporting_quotes": [{"chunk_id": "C1", "quote": "exact text from chunk"}]'
@@ -454,12 +1026,27 @@ Do NOT prefix options with A, B, C, D. Do NOT include options in the question te
 
 # ─── Prompt Builders (per agent) ───
 
+def build_shared_system(role: str, material_section: str, syllabus_context: str, extra_context: str = "") -> str:
+    """
+    System message for an agent's /api/chat call.
+    The study material and syllabus mapping come first and are byte-identical for
+    every agent and attempt of a question, so Ollama can reuse the cached prefix;
+    the agent's role goes last.
+    """
+    return f"""{material_section}
+
+{syllabus_context}
+{extra_context}
+YOUR ROLE: {AGENTS[role]["role"]}"""
+
+
 def build_agent_a_prompt(
     subject, topic, question_type, difficulty, bloom, material_section,
     syllabus_context, sample_context, skill_context, format_instruction,
-    attempt: int = 1, diversity_hint: str = "",
+    attempt: int = 1, diversity_hint: str = "", shared: bool = False,
 ) -> str:
-    """Build Agent A (Logician) prompt with Bloom-aware instructions."""
+    """Build Agent A (Logician) prompt with Bloom-aware instructions.
+    With shared=True the context sections are left out (sent via build_shared_system)."""
     bloom_verbs = BLOOM_VERB_BANK.get(bloom, BLOOM_VERB_BANK["apply"])
     
     bloom_instruction = ""
@@ -490,14 +1077,10 @@ SYNTHESIS REQUIREMENT (Final attempt):
 - The question MUST draw from at least 2 different chunks.
 - Avoid any format that can be answered by quoting a single sentence."""
 
-    return f"""You are an expert question paper setter for {subject}.
-
-{material_section}
-
-{syllabus_context}
-{sample_context}
-{skill_context}
+    context = "" if shared else f"\n{material_section}\n\n{syllabus_context}\n{sample_context}\n{skill_context}\n"
 
+    return f"""You are an expert question paper setter for {subject}.
+{context}
 Generate exactly 1 {question_type} question about "{topic}".
 Difficulty: {difficulty}
 {bloom_instruction}
@@ -529,15 +1112,13 @@ CRITICAL: "question_text" must be a plain text string at the top level.
 
 def build_agent_b_prompt(
     question_type, topic, rag_labeled, syllabus_context, agent_a_output, bloom,
+    shared: bool = False,
 ) -> str:
     """Build Agent B (Creative Reviewer) prompt with structured review schema."""
-    return f"""Review this {question_type} question about "{topic}" at Bloom's level: {bloom.upper()}.
-
-STUDY MATERIAL:
-{rag_labeled}
-
-{syllabus_context}
+    context = "" if shared else f"\nSTUDY MATERIAL:\n{rag_labeled}\n\n{syllabus_context}\n"
 
+    return f"""Review this {question_type} question about "{topic}" at Bloom's level: {bloom.upper()}.
+{context}
 DRAFT TO REVIEW:
 {agent_a_output}
 
@@ -551,28 +1132,33 @@ YOUR REVIEW TASKS:
 7. For MCQs: Ensure options do NOT contain A, B, C, D prefixes and are NOT included in the question text.
 
 OUTPUT JSON format (RAW JSON ONLY):
-{{"score": <1-10>, "issues": ["issue1", "issue2"], "improved_question": <FULL QUESTION JSON IN SAME SCHEMA AS DRAFT including used_chunks and supporting_quotes>, "grounding_report": {{"factually_grounded": true/false, "missing_evidence": ["..."], "directness_flag": true/false}}}}
+{{"score": <1-10>, "issues": ["issue1", "issue2"], "patches": [{{"find": "exact text copied from the draft", "replace": "corrected text"}}], "factually_grounded": true/false, "missing_evidence": ["..."], "directness_flag": true/false}}
 
 RULES:
-- "improved_question" must be a COMPLETE question JSON object (not just text), with all citation fields.
-- If the draft is good, return it as improved_question unchanged.
+- Do NOT rewrite the whole question. Express every fix as a targeted patch.
+- "find" must be copied VERBATIM from the draft (question text, an option, the answer or explanation) and be long enough to be unambiguous.
+- If an option you patch is also the correct_answer, the same patch fixes both.
+- If the draft is good, return "patches": [].
 - Output RAW JSON ONLY. NO MARKDOWN. NO COMMENTS."""
 
 
 def build_agent_c_prompt(
     subject, topic, question_type, difficulty, bloom, material_section,
     syllabus_context, sample_context, skill_context, format_instruction,
-    attempt: int = 1, agent_a_output: str = "",
+    attempt: int = 1, agent_a_output: str = "", shared: bool = False,
 ) -> str:
     """Build Agent C (Technician) prompt — alternative generation."""
     bloom_verbs = BLOOM_VERB_BANK.get(bloom, BLOOM_VERB_BANK["apply"])
     
-    differentiation = ""
     if agent_a_output:
         differentiation = f"""
 DIFFERENTIATION: Another agent already generated this draft:
 {agent_a_output[:300]}...
 You MUST generate a DIFFERENT question — different angle, different chunks, different cognitive demand."""
+    else:
+        differentiation = """
+DIFFERENTIATION: Another agent is drafting a question on this topic in parallel.
+Take a DIFFERENT angle from the most obvious one — e.g. an application, comparison, limitation or edge case, drawing on less central chunks."""
 
     bloom_instruction = ""
     if is_higher_order_bloom(bloom):
@@ -581,13 +1167,10 @@ BLOOM'S LEVEL: {bloom.upper()} — Use verbs like: {bloom_verbs}.
 - Require multi-step reasoning or synthesis. NO simple recall.
 - Use 2+ chunks for cross-concept questions."""
 
-    return f"""You are an expert question paper setter for {subject}.
-
-{material_section}
+    context = "" if shared else f"\n{material_section}\n\n{syllabus_context}\n{sample_context}\n{skill_context}"
 
-{syllabus_context}
-{sample_context}
-{skill_context}
+    return f"""You are an expert question paper setter for {subject}.
+{context}
 {differentiation}
 
 Generate exactly 1 {question_type} question about "{topic}".
@@ -618,20 +1201,19 @@ CRITICAL: "question_text" must be a plain text string at the top level.
 
 def build_chairman_prompt(
     rag_labeled, syllabus_context, agent_a_output, agent_b_output, agent_c_output, bloom,
+    shared: bool = False, agent_c_review: str = "",
 ) -> str:
     """Build Chairman prompt with structured selection, confidence scoring, and OBE alignment."""
-    return f"""You are The Chairman of the Academic Council. Select the BEST question draft.
-
-STUDY MATERIAL:
-{rag_labeled}
-
-{syllabus_context}
+    context = "" if shared else f"\nSTUDY MATERIAL:\n{rag_labeled}\n\n{syllabus_context}\n"
+    c_review = f"\nREVIEW OF DRAFT 2 (Creative): {agent_c_review}" if agent_c_review else ""
 
+    return f"""You are The Chairman of the Academic Council. Select the BEST question draft.
+{context}
 BLOOM'S LEVEL REQUIRED: {bloom.upper()}
 
 DRAFT 1 (Logician): {agent_a_output}
 REVIEW (Creative): {agent_b_output}
-DRAFT 2 (Technician): {agent_c_output}
+DRAFT 2 (Technician): {agent_c_output}{c_review}
 
 SELECTION CRITERIA (in priority order):
 1. FACTUAL ACCURACY: Is it 100% grounded in the Study Material? Are cited chunks valid?
@@ -645,6 +1227,8 @@ CONFIDENCE SCORING GUIDE:
 - 5-7: Mostly correct but minor issues (weak distractors, single chunk, slightly off Bloom)
 - 1-4: Major issues (hallucination, wrong Bloom, no citations, definition-only for higher Bloom)
 
+"selected_from" must be "Agent A", "Agent C", or "Combined" (Agent A's draft with the reviewer's patches applied).
+For "Combined" you may set "selected_question" to null — the patches are applied automatically.
 If ALL drafts fail validation, set action to "regenerate".
 
 OUTPUT JSON format (RAW JSON ONLY):
@@ -663,7 +1247,10 @@ CRITICAL REQUIREMENTS:
 
 # ─── (6) Confidence Post-Processing ───
 
-def adjust_confidence(confidence: float, parsed_q, bloom: str, chunk_map: dict, validation_errors: list) -> float:
+def adjust_confidence(
+    confidence: float, parsed_q, bloom: str, chunk_map: dict, validation_errors: list,
+    higher_order: bool | None = None,
+) -> float:
     """Adjust confidence score based on grounding quality."""
     score = confidence
     
@@ -685,7 +1272,9 @@ def adjust_confidence(confidence: float, parsed_q, bloom: str, chunk_map: dict,
         score = min(10.0, score + 0.5)
     
     # Penalize missing citations for higher-order bloom
-    if is_higher_order_bloom(bloom) and len(used_chunks) < 2:
+    if higher_order is None:
+        higher_order = is_higher_order_bloom(bloom)
+    if higher_order and len(used_chunks) < 2:
         score = min(score, 5.0)
     
     return round(max(1.0, min(10.0, score)), 1)
@@ -707,6 +1296,134 @@ Output RAW JSON ONLY. No explanation."""
     return fixed
 
 
+def _record_len(step: str, question_type: str, text: str):
+    # Truncated replies are recorded too, so a cap set too low climbs back up
+    if text:
+        _len_stats.setdefault((step, question_type), deque(maxlen=200)).append(len(text) // 3)
+
+
+def _num_predict(step: str, role: str, question_type: str) -> int:
+    cap = AGENTS[role]["num_predict"]
+    samples = _len_stats.get((step, question_type))
+    if not samples or len(samples) < NUM_PREDICT_MIN_SAMPLES:
+        return cap
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return max(NUM_PREDICT_FLOOR, min(cap, int(p95 * NUM_PREDICT_HEADROOM)))
+
+
+def _fast_path_question(review, agent_a_output: str):
+    """
+    Question to accept without Agent C and the Chairman, or None.
+    Only taken when Agent B scores the draft >= FAST_PATH_MIN_REVIEW_SCORE and
+    reports it as factually grounded; B's patches are applied to A's draft.
+    """
+    if not isinstance(review, dict):
+        return None
+    try:
+        score = float(review.get("score", 0))
+    except (TypeError, ValueError):
+        return None
+    report = review.get("grounding_report")
+    grounded = review.get("factually_grounded")
+    if grounded is None and isinstance(report, dict):
+        grounded = report.get("factually_grounded")
+    if score < FAST_PATH_MIN_REVIEW_SCORE or grounded is not True:
+        return None
+    return _apply_patches(parse_json(agent_a_output), review.get("patches"))
+
+
+def _review_score(review):
+    if not isinstance(review, dict):
+        return None
+    try:
+        return float(review.get("score"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _heuristic_pick(review_a, review_c, agent_a_output: str, agent_c_output: str):
+    """
+    (question, confidence, selected_from) when Agent B's scores for A and C differ
+    by >= HEURISTIC_MIN_SCORE_GAP and the winner is not flagged as ungrounded;
+    None means the Chairman has to decide.
+    """
+    score_a, score_c = _review_score(review_a), _review_score(review_c)
+    if score_a is None or score_c is None or abs(score_a - score_c) < HEURISTIC_MIN_SCORE_GAP:
+        return None
+    if score_a > score_c:
+        review, draft, label = review_a, agent_a_output, "Agent A (heuristic)"
+    else:
+        review, draft, label = review_c, agent_c_output, "Agent C (heuristic)"
+    if review.get("factually_grounded") is False:
+        return None
+    question = _apply_patches(parse_json(draft), review.get("patches"))
+    if question is None:
+        return None
+    return question, max(score_a, score_c), label
+
+
+def _apply_patches(draft, patches):
+    """
+    Apply Agent B's [{"find", "replace"}] edits to a parsed draft.
+    Each patch replaces the first occurrence of `find` in every string value
+    (question_text, options, correct_answer, ...), so an option and an identical
+    correct_answer stay in sync. Patches whose `find` is absent are ignored.
+    """
+    if not isinstance(draft, dict):
+        return None
+    edits = [
+        (p["find"], p.get("replace") or "")
+        for p in (patches if isinstance(patches, list) else [])
+        if isinstance(p, dict) and isinstance(p.get("find"), str) and p["find"]
+    ]
+    if not edits:
+        return draft
+
+    def _patch(value):
+        if isinstance(value, str):
+            for find, replace in edits:
+                value = value.replace(find, replace, 1)
+            return value
+        if isinstance(value, list):
+            return [_patch(v) for v in value]
+        if isinstance(value, dict):
+            return {k: _patch(v) for k, v in value.items()}
+        return value
+
+    return _patch(draft)
+
+
+async def _with_timeout(step: str, coro) -> tuple[str, float]:
+    """Await a call_ollama* coroutine under TIMEOUTS[step]; a timeout raises OllamaCallError."""
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coro, timeout=TIMEOUTS[step])
+    except asyncio.TimeoutError:
+        raise OllamaCallError(f"{step} timed out after {TIMEOUTS[step]}s", time.perf_counter() - start) from None
+
+
+# The Chairman schema puts "action" first, so a rejection is visible in the first tokens
+_CHAIRMAN_REGENERATE_RE = re.compile(r'"action"\s*:\s*"regenerate"', re.IGNORECASE)
+
+
+def _cancel_tasks(*tasks):
+    for task in tasks:
+        if task is not None and not task.done():
+            task.cancel()
+
+
+def _agent_c_retry_note(attempt: int) -> str:
+    return f"""
+
+RETRY (attempt {attempt}): earlier drafts on this topic were rejected.
+Take a clearly different angle and draw on different chunks than an obvious first attempt would."""
+
+
+def _chat(system: str, prompt: str) -> list[dict]:
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+
 # ─── Main Generation Function (upgraded with parallelization & caps) ───
 
 async def generate_single_question(
@@ -727,193 +1444,320 @@ async def generate_single_question(
     timings = {}
     models_used = {}
 
-    # Resolve models
-    agent_a_model = await resolve_model(AGENTS["logician"]["model"], available_models)
-    agent_b_model = await resolve_model(AGENTS["creative"]["model"], available_models)
-    agent_c_model = await resolve_model(AGENTS["technician"]["model"], available_models)
-    chairman_model = await resolve_model(AGENTS["chairman"]["model"], available_models)
-
-    models_used = {
-        "agent_a": agent_a_model, "agent_b": agent_b_model,
-        "agent_c": agent_c_model, "chairman": chairman_model,
-    }
+    # Resolve models (one cached lookup per available-models list)
+    models_used = resolve_council_models(available_models)
+    agent_a_model, agent_b_model = models_used["agent_a"], models_used["agent_b"]
+    agent_c_model, chairman_model = models_used["agent_c"], models_used["chairman"]
 
     # ─── Resolve Bloom Level ───
     bloom = resolve_bloom(bloom_level, syllabus_data, difficulty)
+    higher_order = is_higher_order_bloom(bloom)
+    multi_step = needs_multi_step(bloom, difficulty)
     
     # ─── (3) RAG Context Size Cap (Top 6) ───
     raw_chunks = [c.strip() for c in rag_context.split("\n\n") if c.strip()][:6]
-    rag_labeled, chunk_map = format_rag_as_labeled_chunks("\n\n".join(raw_chunks))
+    rag_labeled, chunk_map = format_rag_as_labeled_chunks(raw_chunks=raw_chunks)
+    chunk_map_lower = {k: v.lower() for k, v in chunk_map.items()}
     material_section = f"STUDY MATERIAL (PRIMARY SOURCE — cite chunks [C1]-[C{len(chunk_map)}]):\n{rag_labeled}" if rag_labeled else "STUDY MATERIAL: None available."
 
     if syllabus_data is None:
         syllabus_data = {}
 
-    # ... (Syllabus/Context formatting remains same) ...
-    syllabus_context = "No specific syllabus mapping provided."
-    if syllabus_data:
-        los = "\n".join([f"- {acc}: {desc}" for acc, desc in syllabus_data.get("los", {}).items()]) if syllabus_data.get("los") else "[No LOs mapped for this unit]"
-        cos = "\n".join([f"- {acc}: {desc}" for acc, desc in syllabus_data.get("cos", {}).items()]) if syllabus_data.get("cos") else "[No COs mapped for this unit]"
-        blooms = "\n".join([f"- {level}: {weight}%" for level, weight in syllabus_data.get("bloom_distribution", {}).items()]) if syllabus_data.get("bloom_distribution") else "[No Bloom data]"
-        syllabus_context = f"SYLLABUS MAPPING:\nLearning Outcomes: {los}\nCourse Outcomes: {cos}\nBloom's: {blooms}\n"
+    syllabus_context = build_syllabus_context(syllabus_data)
 
     sample_context = f"\nSAMPLE QUESTIONS:\n{sample_questions}\n" if sample_questions else ""
     skill_context = f"\nGUIDELINES:\n{extract_skill_sections(skill_content)}\n" if skill_content else ""
 
     format_instruction = get_format_instruction(question_type, bloom)
 
-    print(f"[Swarm] Generation - Topic: {topic}, Bloom: {bloom}, Top {len(chunk_map)} Chunks")
+    # Shared context travels once per agent as the chat system message; the
+    # per-agent user prompts below only carry the task (and drafts to review).
+    drafter_context = f"{sample_context}{skill_context}"
+    system_a = build_shared_system("logician", material_section, syllabus_context, drafter_context)
+    system_b = build_shared_system("creative", material_section, syllabus_context)
+    system_c = build_shared_system("technician", material_section, syllabus_context, drafter_context)
+    system_chairman = build_shared_system("chairman", material_section, syllabus_context)
+
+    logger.info("Generation - Topic: %s, Bloom: %s, Top %d Chunks", topic, bloom, len(chunk_map))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("RAG context head: %s...", rag_context[:100])
 
     best_result = None
     best_confidence = 0.0
     all_validation_errors = []
 
-    for attempt in range(1, max_attempts + 1):
-        attempt_timings = {}
-        recent_qs = _session_questions[-5:] if '_session_questions' in globals() else []
-        diversity_hint = f"\nEXCLUSION LIST (Do NOT generate questions similar to these):\n" + "\n".join([f"- {q[:150]}..." for q in recent_qs]) + "\n" if recent_qs else ""
-
-        # --- Phase 1: Agent A (Logician) ---
-        # Temp 0.4 for stability, num_predict 800
-        agent_a_prompt = build_agent_a_prompt(
-            subject, topic, question_type, difficulty, bloom,
-            material_section, syllabus_context, sample_context, skill_context,
-            format_instruction, attempt, diversity_hint,
-        )
-        agent_a_output, agent_a_time = await call_ollama(
-            agent_a_model, agent_a_prompt, AGENTS["logician"]["role"],
-            temperature=0.4, num_predict=800
-        )
-        attempt_timings["agent_a"] = agent_a_time
+    # Everything below except A's diversity section is invariant across attempts,
+    # so it is built once per question
+    recent_qs = _session_questions[-5:]
+    diversity_hint = f"\nEXCLUSION LIST (Do NOT generate questions similar to these):\n" + "\n".join([f"- {q[:150]}..." for q in recent_qs]) + "\n" if recent_qs else ""
+    agent_c_base_prompt = build_agent_c_prompt(
+        subject, topic, question_type, difficulty, bloom,
+        material_section, syllabus_context, sample_context, skill_context,
+        format_instruction, shared=True,
+    )
 
-        # ─── (1) Parallelize Agent B and Agent C ───
-        
+    async def _draft_and_review(step, model, system, prompt, role):
+        # Temp 0.4 for stability; output budget is per role (see AGENTS)
+        # A failed call yields "" so error text never reaches B or the Chairman;
+        # the failed steps are returned so callers can still report them
+        try:
+            draft, draft_time = await _with_timeout(step, call_ollama_chat(
+                model, _chat(system, prompt),
+                temperature=0.4, num_predict=_num_predict(step, role, question_type), fmt="json", raise_errors=True,
+                # Sampled: a repeated draft request should get a fresh draft, not a replay
+                cache=False,
+            ))
+            _record_len(step, question_type, draft)
+        except OllamaCallError as e:
+            logger.warning("%s failed, skipping its review: %s", step, e)
+            return "", e.elapsed, "", 0.0, (step,)
         agent_b_prompt = build_agent_b_prompt(
-            question_type, topic, rag_labeled, syllabus_context, agent_a_output, bloom,
+            question_type, topic, rag_labeled, syllabus_context, draft, bloom, shared=True,
         )
-        agent_c_prompt = build_agent_c_prompt(
+        try:
+            review, review_time = await _with_timeout("agent_b", call_ollama_chat(
+                agent_b_model, _chat(system_b, agent_b_prompt),
+                temperature=AGENTS["creative"]["temperature"],
+                num_predict=_num_predict("agent_b", "creative", question_type),
+                fmt="json", raise_errors=True,
+            ))
+            _record_len("agent_b", question_type, review)
+        except OllamaCallError as e:
+            logger.warning("agent_b review of %s failed: %s", step, e)
+            return draft, draft_time, "", e.elapsed, ("agent_b",)
+        return draft, draft_time, review, review_time, ()
+
+    def _start_drafts(n: int) -> tuple[asyncio.Task, asyncio.Task]:
+        agent_a_prompt = build_agent_a_prompt(
             subject, topic, question_type, difficulty, bloom,
             material_section, syllabus_context, sample_context, skill_context,
-            format_instruction, attempt, agent_a_output,
-        )
-
-        tasks = [
-            call_ollama(agent_b_model, agent_b_prompt, AGENTS["creative"]["role"], temperature=0.7, num_predict=600),
-            call_ollama(agent_c_model, agent_c_prompt, AGENTS["technician"]["role"], temperature=0.4, num_predict=800)
-        ]
-        
-        (agent_b_output, b_time), (agent_c_output, c_time) = await asyncio.gather(*tasks)
-        attempt_timings["agent_b"] = b_time
-        attempt_timings["agent_c"] = c_time
-
-        # --- Phase 4: Chairman ---
-        chairman_prompt = build_chairman_prompt(
-            rag_labeled, syllabus_context, agent_a_output, agent_b_output, agent_c_output, bloom,
-        )
-        chairman_output, chairman_time = await call_ollama(
-            chairman_model, chairman_prompt, AGENTS["chairman"]["role"],
-            temperature=0.4, num_predict=700
+            format_instruction, n, diversity_hint, shared=True,
         )
-        attempt_timings["chairman"] = chairman_time
-        attempt_timings["total"] = sum(attempt_timings.values())
-
-        # --- Parse & Repair ---
-        parsed_chairman = parse_json(chairman_output)
-        
-        # ─── (4) Fail-Fast JSON Repair ───
-        if not parsed_chairman and chairman_output.strip():
-            print(f"[Swarm] Chairman JSON malformed. Triggering one-shot repair...")
-            repaired = await repair_json(chairman_model, chairman_output, '{"action":"...","selected_question":{...},"confidence_score":...}')
-            parsed_chairman = parse_json(repaired)
-            if parsed_chairman:
-                print(f"[Swarm] Repair successful.")
-                chairman_output = repaired
-
-        final_question = None
-        confidence_score = 5.0
-        selected_from = "Agent A"
-        chairman_action = "accept"
-
-        if parsed_chairman and isinstance(parsed_chairman, dict):
-            final_question = parsed_chairman.get("selected_question")
-            confidence_score = float(parsed_chairman.get("confidence_score", 5.0))
-            selected_from = parsed_chairman.get("selected_from", "Agent A")
-            chairman_action = parsed_chairman.get("action", "accept")
-        else:
-            final_question = parse_json(agent_a_output)
-            selected_from = "Agent A (fallback)"
-
-        # ─── Normalize: LLM sometimes wraps the question in a list ───
-        if isinstance(final_question, list):
-            # Extract first dict from the list
-            final_question = next((item for item in final_question if isinstance(item, dict)), None)
-
-        # ─── Auto-repair MCQ options if not exactly 4 ───
-        if question_type == "MCQ" and isinstance(final_question, dict):
-            mcq_opts = final_question.get("options", [])
-            if not isinstance(mcq_opts, list) or len(mcq_opts) != 4:
-                final_question = await repair_mcq_options(
-                    final_question, chairman_model, question_type, chunk_map,
-                )
-
-        # Validate the selected question
-        validation_errors = validate_question_output(
-            final_question, question_type, bloom, difficulty, chunk_map,
+        # The retry note steers a retried C draft away from the previous attempt's angle
+        agent_c_prompt = agent_c_base_prompt if n == 1 else agent_c_base_prompt + _agent_c_retry_note(n)
+        return (
+            asyncio.create_task(_draft_and_review("agent_a", agent_a_model, system_a, agent_a_prompt, "logician")),
+            asyncio.create_task(_draft_and_review("agent_c", agent_c_model, system_c, agent_c_prompt, "technician")),
         )
 
-        # Dedup check
-        qt = ""
-        if final_question and isinstance(final_question, dict):
-            qt = final_question.get("question_text") or final_question.get("question") or ""
-        if qt and is_duplicate(qt):
-            validation_errors.append("Duplicate of previous question in this session")
-
-        # Adjust confidence
-        confidence_score = adjust_confidence(confidence_score, final_question, bloom, chunk_map, validation_errors)
-
-        # Build result
-        attempt_result = {
-            "question": final_question,
-            "confidence_score": confidence_score,
-            "selected_from": selected_from,
-            "agent_a_draft": agent_a_output,
-            "agent_b_review": agent_b_output,
-            "agent_c_draft": agent_c_output,
-            "chairman_output": chairman_output,
-            "rag_context_used": rag_context,
-            "timings": attempt_timings,
-            "models_used": models_used,
-            "bloom_level": bloom,
-            "attempt": attempt,
-            "validation_errors": validation_errors,
-        }
-
-        print(f"[Swarm] Attempt {attempt}/{max_attempts}: confidence={confidence_score}, errors={len(validation_errors)}, action={chairman_action}")
-        if validation_errors:
-            print(f"[Swarm] Rejection Reasons: {validation_errors}")
-
-        # Accept if valid
-        if not validation_errors and chairman_action == "accept":
-            if qt:
-                register_in_session(qt)
-            # Accumulate timings across attempts
-            if best_result:
-                for k, v in attempt_timings.items():
-                    attempt_result["timings"][k] = attempt_result["timings"].get(k, 0) + best_result["timings"].get(k, 0)
-            return attempt_result
-
-        # Track best attempt
-        all_validation_errors.extend(validation_errors)
-        if confidence_score > best_confidence:
-            best_confidence = confidence_score
-            best_result = attempt_result
-
-        if attempt < max_attempts:
-            print(f"[Swarm] Regenerating (attempt {attempt + 1})... Reason: {validation_errors[0] if validation_errors else 'Chairman REGENERATE'}")
+    attempt_result = {
+        "rag_context_used": rag_context,
+        "models_used": models_used,
+        "bloom_level": bloom,
+    }
+    a_task = c_task = spec = None
+    # Every draft task is cancelled on the way out, so an unexpected failure or
+    # an accepted attempt never leaves an orphaned request running. Ollama
+    # failures and per-step timeouts are already absorbed in _draft_and_review.
+    try:
+        for attempt in range(1, max_attempts + 1):
+            attempt_timings = {}
+
+            # ─── (1) Parallel drafts: {A → B} runs alongside {C → B} ───
+            # C drafts independently of A, so it no longer waits for A's output;
+            # B reviews each draft as soon as it finishes. A rejected attempt's
+            # successor may already have been started while its Chairman ran.
+            a_task, c_task = spec or _start_drafts(attempt)
+            spec = None
+            agent_a_output, agent_a_time, agent_b_output, b_time, failed = await a_task
+            failed_steps = set(failed)
+            # ─── Fast path: B already rates A's draft as excellent and grounded ───
+            review = parse_json(agent_b_output)
+            decided = _fast_path_question(review, agent_a_output)
+            if decided is not None:
+                c_task.cancel()
+            attempt_timings["agent_a"] = agent_a_time
+            attempt_timings["agent_b"] = b_time
+            agent_c_review = ""
+
+            if decided is not None:
+                agent_c_output, attempt_timings["agent_c"] = "", 0.0
+                logger.info("Fast path: Agent B scored the draft %s; skipping Agent C and Chairman", review.get("score"))
+                decided = (decided, float(review["score"]), "Agent A (fast-path)")
+            else:
+                agent_c_output, c_time, agent_c_review, c_review_time, failed = await c_task
+                failed_steps.update(failed)
+                attempt_timings["agent_c"] = c_time
+                attempt_timings["agent_b"] += c_review_time
+                # ─── Heuristic selection: B's scores for A and C are far apart ───
+                decided = _heuristic_pick(review, parse_json(agent_c_review), agent_a_output, agent_c_output)
+                if decided is not None:
+                    logger.info("Heuristic selection: %s; skipping Chairman", decided[2])
+
+            if decided is not None:
+                final_question, confidence_score, selected_from = decided
+                chairman_action = "accept"
+                chairman_output = ""
+            else:
+                # --- Phase 4: Chairman ---
+                # Speculatively draft the next attempt while the Chairman decides;
+                # the drafts are cancelled if this attempt is accepted
+                if attempt < max_attempts:
+                    spec = _start_drafts(attempt + 1)
+                    spec_started = time.perf_counter()
+                chairman_prompt = build_chairman_prompt(
+                    rag_labeled, syllabus_context, agent_a_output, agent_b_output, agent_c_output, bloom, shared=True,
+                    agent_c_review=agent_c_review,
+                )
+                try:
+                    chairman_output, chairman_time = await _with_timeout("chairman", call_ollama_chat(
+                        chairman_model, _chat(system_chairman, chairman_prompt),
+                        temperature=AGENTS["chairman"]["temperature"],
+                        num_predict=_num_predict("chairman", "chairman", question_type),
+                        fmt="json", raise_errors=True,
+                        # Another attempt follows a rejection, so the rest of the verdict is not needed
+                        stop_at=_CHAIRMAN_REGENERATE_RE if attempt < max_attempts else None,
+                    ))
+                except OllamaCallError as e:
+                    # Empty output skips the JSON repair and falls back to Agent A's draft
+                    logger.warning("Chairman failed: %s", e)
+                    chairman_output, chairman_time = "", e.elapsed
+                    failed_steps.add("chairman")
+                attempt_timings["chairman"] = chairman_time
+
+                # --- Parse & Repair ---
+                parsed_chairman = parse_json(chairman_output)
+                early_reject = (
+                    attempt < max_attempts and not parsed_chairman
+                    and _CHAIRMAN_REGENERATE_RE.search(chairman_output) is not None
+                )
+                if early_reject:
+                    logger.info("Chairman rejected the drafts; stopped reading its reply early")
+                elif chairman_output:
+                    # Early-stopped replies would drag the output budget down
+                    _record_len("chairman", question_type, chairman_output)
+
+                # A reply cut off by num_predict only needs its brackets closed
+                if not parsed_chairman and not early_reject and chairman_output.strip():
+                    closed = _try_autoclose(chairman_output)
+                    parsed_chairman = parse_json(closed) if closed else None
+                    if parsed_chairman:
+                        logger.info("Chairman JSON was truncated; closed it without a repair call.")
+                        chairman_output = closed
+
+                # ─── (4) Fail-Fast JSON Repair ───
+                if not parsed_chairman and not early_reject and chairman_output.strip():
+                    logger.info("Chairman JSON malformed. Triggering one-shot repair...")
+                    repaired = await repair_json(chairman_model, chairman_output, '{"action":"...","selected_question":{...},"confidence_score":...}')
+                    parsed_chairman = parse_json(repaired)
+                    if parsed_chairman:
+                        logger.info("Repair successful.")
+                        chairman_output = repaired
+
+                final_question = None
+                confidence_score = 5.0
+                selected_from = "Agent A"
+                chairman_action = "accept"
+
+                if early_reject:
+                    # Keep A's draft as this attempt's candidate in case no later attempt passes
+                    final_question = parse_json(agent_a_output)
+                    selected_from = "Agent A (Chairman regenerate)"
+                    chairman_action = "regenerate"
+                elif parsed_chairman and isinstance(parsed_chairman, dict):
+                    final_question = parsed_chairman.get("selected_question")
+                    confidence_score = float(parsed_chairman.get("confidence_score", 5.0))
+                    selected_from = parsed_chairman.get("selected_from", "Agent A")
+                    chairman_action = parsed_chairman.get("action", "accept")
+                    # B only returns patches now, so "Combined" is rebuilt here from A's draft
+                    if str(selected_from).lower() in ("combined", "agent b"):
+                        patched = _apply_patches(
+                            parse_json(agent_a_output), review.get("patches") if isinstance(review, dict) else None,
+                        )
+                        if patched is not None:
+                            final_question = patched
+                else:
+                    final_question = parse_json(agent_a_output)
+                    selected_from = "Agent A (fallback)"
+
+            attempt_timings["total"] = sum(attempt_timings.values())
+
+            # ─── Normalize: LLM sometimes wraps the question in a list ───
+            if isinstance(final_question, list):
+                # Extract first dict from the list
+                final_question = next((item for item in final_question if isinstance(item, dict)), None)
+
+            # ─── Auto-repair MCQ options if not exactly 4 ───
+            if question_type == "MCQ" and isinstance(final_question, dict):
+                mcq_opts = final_question.get("options", [])
+                if not isinstance(mcq_opts, list) or len(mcq_opts) != 4:
+                    final_question = await repair_mcq_options(
+                        final_question, chairman_model, question_type, chunk_map,
+                    )
+
+            # Validate the selected question
+            validation_errors = validate_question_output(
+                final_question, question_type, bloom, difficulty, chunk_map, chunk_map_lower, multi_step,
+            )
+
+            # Dedup check
+            qt = ""
+            if final_question and isinstance(final_question, dict):
+                qt = final_question.get("question_text") or final_question.get("question") or ""
+            if qt and is_duplicate(qt):
+                validation_errors.append("Duplicate of previous question in this session")
+
+            # Adjust confidence
+            confidence_score = adjust_confidence(
+                confidence_score, final_question, bloom, chunk_map, validation_errors, higher_order,
+            )
+
+            # Fill in this attempt's fields; the per-question ones were set before the loop
+            attempt_result.update(
+                question=final_question,
+                confidence_score=confidence_score,
+                selected_from=selected_from,
+                agent_a_draft=agent_a_output,
+                agent_b_review=agent_b_output,
+                agent_c_draft=agent_c_output,
+                agent_c_review=agent_c_review,
+                chairman_output=chairman_output,
+                timings=attempt_timings,
+                failed_steps=sorted(failed_steps),
+                attempt=attempt,
+                validation_errors=validation_errors,
+            )
+
+            logger.info(
+                "Attempt %d/%d: confidence=%s, errors=%d, action=%s",
+                attempt, max_attempts, confidence_score, len(validation_errors), chairman_action,
+            )
+            if validation_errors:
+                logger.info("Rejection Reasons: %s", validation_errors)
+
+            # Accept if valid
+            if not validation_errors and chairman_action == "accept":
+                if spec is not None:
+                    _cancel_tasks(*spec)
+                    spec = None
+                    attempt_timings["speculative_wasted"] = time.perf_counter() - spec_started
+                if qt:
+                    register_in_session(qt)
+                # Accumulate timings across attempts (update() keeps zero entries, unlike +)
+                if best_result:
+                    merged = Counter(best_result["timings"])
+                    merged.update(attempt_timings)
+                    attempt_result["timings"] = dict(merged)
+                return attempt_result
+
+            # Track best attempt
+            all_validation_errors.extend(validation_errors)
+            if confidence_score > best_confidence:
+                best_confidence = confidence_score
+                # Copy: attempt_result is overwritten by the next attempt
+                best_result = {**attempt_result}
+
+            if attempt < max_attempts:
+                logger.info(
+                    "Regenerating (attempt %d)... Reason: %s",
+                    attempt + 1, validation_errors[0] if validation_errors else "Chairman REGENERATE",
+                )
 
+    finally:
+        _cancel_tasks(a_task, c_task, *(spec or ()))
 
     # All attempts exhausted — return best with low confidence
-    print(f"[Swarm] All {max_attempts} attempts exhausted. Returning best (confidence={best_confidence})")
+    logger.info("All %d attempts exhausted. Returning best (confidence=%s)", max_attempts, best_confidence)
     if best_result:
         best_result["confidence_score"] = min(best_result["confidence_score"], 4.0)
         best_result["validation_errors"] = all_validation_errors[:5]
@@ -929,7 +1773,30 @@ async def generate_single_question(
         "question": None, "confidence_score": 1.0, "selected_from": "None",
         "agent_a_draft": "", "agent_b_review": "", "agent_c_draft": "",
         "chairman_output": "", "rag_context_used": rag_context,
-        "timings": {"total": 0}, "models_used": models_used,
+        "timings": {"total": 0}, "failed_steps": [], "models_used": models_used,
         "bloom_level": bloom, "attempt": max_attempts,
         "validation_errors": ["All generation attempts failed"],
     }
+
+
+async def generate_questions_batch(specs: list[dict], max_concurrency: int = 4) -> list[dict]:
+    """
+    Run generate_single_question for many question specs concurrently.
+    Each spec holds generate_single_question's keyword arguments; `available_models`
+    is filled in from a single Ollama probe when a spec omits it.
+    At most `max_concurrency` councils run at once (match Ollama's parallel slots).
+    Results are returned in spec order.
+    """
+    if any("available_models" not in s for s in specs):
+        available_models = (await check_ollama())["models"]
+        specs = [{"available_models": available_models, **s} for s in specs]
+
+    # Each council holds up to 3 connections at once (A, B and C); keep inside the pool
+    max_concurrency = max(1, min(max_concurrency, OLLAMA_MAX_CONN // 3))
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(spec: dict) -> dict:
+        async with sem:
+            return await generate_single_question(**spec)
+
+    return await asyncio.gather(*(_one(s) for s in specs))
@@ -3,7 +3,11 @@ from services.swarm import (
     resolve_bloom, format_rag_as_labeled_chunks, validate_question_output,
     is_duplicate, register_in_session, clear_session, adjust_confidence,
     is_higher_order_bloom, build_agent_a_prompt, get_format_instruction,
+    parse_json, _try_autoclose, _BracketScanner, _read_json_stream, _apply_patches,
+    _fast_path_question, _heuristic_pick,
 )
+import asyncio
+import json
 
 print("=== Bloom Resolution ===")
 assert resolve_bloom("application") == "apply"
@@ -21,6 +25,104 @@ assert "C1" in cmap and "C2" in cmap
 assert "[C1]" in labeled and "[C2]" in labeled
 print(f"  {len(cmap)} chunks, IDs: {list(cmap.keys())} [PASS]")
 
+print("=== JSON Autoclose ===")
+assert _try_autoclose('{"a": [1, 2,') == '{"a": [1, 2]}'
+assert _try_autoclose('{"q": "open str') == '{"q": "open str"}'
+assert _try_autoclose('{"q": "a\\') == '{"q": "a"}'  # dangling escape dropped
+assert _try_autoclose('{"k":') == '{"k": null}'
+assert _try_autoclose('{"a": "}]"') == '{"a": "}]"}'  # brackets inside strings ignored
+assert _try_autoclose('{"a": 1}') is None
+assert _try_autoclose("no json here") is None
+assert parse_json(_try_autoclose('noise {"x": {"y": [1')) == {"x": {"y": [1]}}
+print("  [PASS]")
+
+print("=== Bracket Scanner ===")
+sc = _BracketScanner()
+assert sc.feed('prefix {"a": "x') == -1
+assert sc.feed('}{ still in string", ') == -1  # string state carries across chunks
+assert sc.feed('"b": [1]} tail') == len('"b": [1]}')
+sc = _BracketScanner()
+assert sc.feed('[1, "\\"]"') == -1  # escaped quote keeps the string open
+assert sc.feed(', 2]') == 4
+
+
+class _FakeStream:
+    """Stands in for an aiohttp response streaming Ollama NDJSON chat chunks."""
+
+    def __init__(self, pieces, done_reason="stop"):
+        lines = [{"message": {"content": p}} for p in pieces]
+        lines.append({"done": True, "done_reason": done_reason})
+        self._lines = [json.dumps(l).encode() + b"\n" for l in lines]
+        self.closed = False
+        self.content = self._iter()
+
+    async def _iter(self):
+        for line in self._lines:
+            if self.closed:
+                return
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+_extract = lambda d: (d.get("message") or {}).get("content", "")
+_stream = lambda *a, **kw: asyncio.run(_read_json_stream(*a, **kw))
+
+resp = _FakeStream(['{"q": "a}', '", "n": 1}', ' trailing padding'])
+assert _stream(resp, _extract) == ('{"q": "a}", "n": 1}', True)
+assert resp.closed
+assert _stream(_FakeStream(['{"q": "cut']), _extract) == ('{"q": "cut', True)
+assert _stream(_FakeStream(['{"q": "cut'], done_reason="length"), _extract) == ('{"q": "cut', False)
+import re
+regen = re.compile(r'"action"\s*:\s*"regenerate"')
+resp = _FakeStream(['{"action": "rege', 'nerate", "reason": "x"', '}'])
+assert _stream(resp, _extract, stop_at=regen) == ('{"action": "regenerate", "reason": "x"', False)
+assert resp.closed
+print("  [PASS]")
+
+print("=== Patches ===")
+draft = {"question_text": "Which drug treats ORN? ORN is late.",
+         "options": ["A. HBO", "B. Pentoxifylline", "C. Steroids", "D. None"],
+         "correct_answer": "B. Pentoxifylline"}
+patched = _apply_patches(draft, [{"find": "ORN", "replace": "osteoradionecrosis"},
+                                 {"find": "Pentoxifylline", "replace": "PENTO"},
+                                 {"find": "absent", "replace": "x"}, {"bad": 1}])
+assert patched["question_text"] == "Which drug treats osteoradionecrosis? ORN is late."  # first occurrence only
+assert patched["options"][1] == "B. PENTO" and patched["correct_answer"] == "B. PENTO"
+assert draft["options"][1] == "B. Pentoxifylline"  # input left untouched
+assert _apply_patches(draft, None) is draft
+assert _apply_patches(None, [{"find": "a", "replace": "b"}]) is None
+print("  [PASS]")
+
+print("=== Fast Path / Heuristic Pick ===")
+a_out = json.dumps(draft)
+c_out = json.dumps({**draft, "question_text": "From C"})
+assert _fast_path_question({"score": 9.5, "factually_grounded": True}, a_out) == draft
+assert _fast_path_question({"score": 9.5, "grounding_report": {"factually_grounded": True}}, a_out) == draft
+assert _fast_path_question({"score": 9.5}, a_out) is None  # grounding not confirmed
+assert _fast_path_question({"score": 7, "factually_grounded": True}, a_out) is None
+assert _fast_path_question({"score": "n/a", "factually_grounded": True}, a_out) is None
+assert _fast_path_question(None, a_out) is None
+q, conf, label = _heuristic_pick({"score": 4}, {"score": 8}, a_out, c_out)
+assert q["question_text"] == "From C" and conf == 8.0 and label.startswith("Agent C")
+assert _heuristic_pick({"score": 7}, {"score": 8}, a_out, c_out) is None  # gap too small
+assert _heuristic_pick({"score": 9, "factually_grounded": False}, {"score": 3}, a_out, c_out) is None
+assert _heuristic_pick({"score": 9}, None, a_out, c_out) is None
+print("  [PASS]")
+
+print("=== Shingle Dedup Threshold ===")
+clear_session()
+base = "Explain the role of hyperbaric oxygen therapy in the management of osteoradionecrosis of the mandible"
+register_in_session(base)
+assert is_duplicate(base.upper() + "  ")  # normalised: case and whitespace
+assert is_duplicate(base + " today")  # small edit stays above the Jaccard threshold
+assert not is_duplicate("Explain the role of hyperbaric oxygen therapy")  # size prefilter rules it out
+assert not is_duplicate("Compare surgical debridement with pentoxifylline for early-stage ORN lesions")
+clear_session()
+assert not is_duplicate(base)
+print("  [PASS]")
+
 print("=== Validation Gate ===")
 # Direct question that should fail for Bloom=apply
 e1 = validate_question_output(
@@ -40,7 +40,7 @@ export function TrainingDashboard({ subjectId }: TrainingDashboardProps) {
         fetchData();
         // Poll status if active
         const interval = setInterval(() => {
-            if (status && ['generating', 'evaluating_baseline', 'evaluating_skill'].includes(status.status)) {
+            if (status && ['generating', 'evaluating', 'evaluating_baseline', 'evaluating_skill'].includes(status.status)) {
                 getTrainingStatus(subjectId).then(setStatus).catch(() => { });
             }
         }, 3000);
@@ -49,7 +49,7 @@ export function TrainingDashboard({ subjectId }: TrainingDashboardProps) {
 
     // ── Elapsed Time Timer ──
     useEffect(() => {
-        const isActive = status?.status && ['generating', 'evaluating_baseline', 'evaluating_skill'].includes(status.status);
+        const isActive = status?.status && ['generating', 'evaluating', 'evaluating_baseline', 'evaluating_skill'].includes(status.status);
 
         if (isActive) {
             if (!timerStart.current) {
@@ -110,7 +110,7 @@ export function TrainingDashboard({ subjectId }: TrainingDashboardProps) {
 
     if (loading) return <ActivityIndicator color="#3B82F6" />;
 
-    const isTraining = status?.status && ['generating', 'evaluating_baseline', 'evaluating_skill'].includes(status.status);
+    const isTraining = status?.status && ['generating', 'evaluating', 'evaluating_baseline', 'evaluating_skill'].includes(status.status);
     const isComplete = status?.status === 'complete';
     const progress = status?.progress || 0;
 
@@ -149,6 +149,7 @@ export function TrainingDashboard({ subjectId }: TrainingDashboardProps) {
                         <View style={{ flexDirection: 'row', justifyContent: 'space-between', alignItems: 'center', marginBottom: 8 }}>
                             <Text style={{ color: '#3B82F6', fontWeight: '600' }}>
                                 {status.status === 'generating' ? 'Generating Skill Guide...' :
+                                    status.status === 'evaluating' ? 'Running Baseline & Skill Tests...' :
                                     status.status === 'evaluating_baseline' ? 'Running Baseline Tests...' :
                                         'Verifying Improvements...'}
                             </Text>
@@ -223,7 +224,12 @@ export function TrainingDashboard({ subjectId }: TrainingDashboardProps) {
                         </View>
                         <View style={{ flex: 1, backgroundColor: 'white', padding: 16, borderRadius: 12, borderColor: '#E5E7EB', borderWidth: 1 }}>
                             <Text style={{ color: '#6B7280', fontSize: 12, marginBottom: 4 }}>After Training</Text>
-                            <Text style={{ color: '#10B981', fontSize: 24, fontWeight: 'bold' }}>{(status.trained_score * 100).toFixed(0)}%</Text>
+                            <Text style={{ color: '#10B981', fontSize: 24, fontWeight: 'bold' }}>
+                                {status.trained_score_partial ? (status.is_active ? '≥ ' : '≤ ') : ''}{(status.trained_score * 100).toFixed(0)}%
+                            </Text>
+                            {status.trained_score_partial && (
+                                <Text style={{ color: '#9CA3AF', fontSize: 11, marginTop: 2 }}>Evaluation stopped early</Text>
+                            )}
                         </View>
                         <View style={{ flex: 1, backgroundColor: '#EFF6FF', padding: 16, borderRadius: 12, borderColor: '#3B82F6', borderWidth: 1, alignItems: 'center', justifyContent: 'center' }}>
                             <Text style={{ color: '#2563EB', fontSize: 12 }}>Impact</Text>